@@ -1,16 +1,27 @@
 # app.py
 
-from flask import Flask, render_template, request, redirect, url_for, session, jsonify
+from flask import Flask, render_template, request, redirect, url_for, session, jsonify, Response, stream_with_context
 import subprocess
 import os
 import csv
 import time
 import json
 from datetime import datetime
-import importlib
 from flask_cors import CORS
 from urllib.parse import urljoin
-from utils.logger import log_buffer   # import log_buffer
+from utils.logger import log_buffers
+from utils.jobs import JobManager, DONE, FAILED
+from utils.browser_pool import get_pool
+from utils.helpers import plugin_options
+from utils.plugin_registry import get_registry
+from utils.result_cache import ResultCache
+from utils.csv_index import read_headers, read_page, iter_rows
+from utils.output import read_meta, OUTPUT_FORMATS
+from utils.result_store import get_store, parse_since
+from utils.seen_keys import as_bool
+from utils.politeness import get_scheduler
+from utils.fanout import ALL_SITES, SITE_TIMEOUT, parse_sites, run_sites, merge_outputs
+from utils import metrics, progress
 import base64   # needed for encoding
 
 app = Flask(__name__)
@@ -21,35 +32,39 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 STATIC_DIR = os.path.join(BASE_DIR, "static")
 os.makedirs(STATIC_DIR, exist_ok=True)
 
+job_manager = JobManager()
+browser_pool = get_pool()
+result_cache = ResultCache()
+plugin_registry = get_registry()
+
+BROWSER_POOL_SIZE = min(int(os.getenv("BROWSER_POOL_SIZE", "2")), job_manager.max_workers)
+if BROWSER_POOL_SIZE > 0:
+    browser_pool.warm(job_manager.executor, BROWSER_POOL_SIZE)
+
 def get_available_plugins():
-    plugin_dir = os.path.join(BASE_DIR, "plugins")
-    return [
-        f[:-3] for f in os.listdir(plugin_dir)
-        if f.endswith(".py") and f != "__init__.py"
-    ]
+    return plugin_registry.list()
+
+def load_table_headers(filename):
+    """Header row of an output CSV; the table body is fetched page by page from /data/.
 
-def load_table_data(filename, max_rows=100):
-    """Load up to max_rows from CSV file (excluding header)."""
+    Other output formats are download-only, so they get no table.
+    """
     file_path = os.path.join(STATIC_DIR, filename)
-    if not os.path.exists(file_path):
-        return None, None
-    with open(file_path, newline='', encoding='utf-8') as f:
-        reader = csv.reader(f)
-        rows = list(reader)
-    if not rows:
-        return None, None
-    headers = rows[0]
-    data = rows[1:max_rows + 1] if max_rows else rows[1:]
-    return headers, data
+    if not filename.endswith(".csv") or not os.path.exists(file_path):
+        return None
+    meta = read_meta(file_path)
+    if meta and meta.get("headers"):
+        return meta["headers"]
+    return read_headers(file_path) or None
 
 def abs_url(path):
     base = request.host_url
     return urljoin(base, path.lstrip("/"))
 
-def try_run_plugin_direct(site, query, output_abs_path, limit):
+def try_run_plugin_direct(site, query, output_abs_path, limit, options=None):
     """Attempt to run a scraper plugin directly via plugins.<site>.run_scraper."""
     try:
-        module = importlib.import_module(f"plugins.{site}")
+        module = plugin_registry.load(site)
     except ModuleNotFoundError:
         return {"success": False, "error": f"Plugin not found for site: {site}"}
     except Exception as e:
@@ -59,7 +74,8 @@ def try_run_plugin_direct(site, query, output_abs_path, limit):
         return {"success": False, "error": f"Plugin {site} has no run_scraper()"}
 
     try:
-        result = module.run_scraper(query, output_file=output_abs_path, limit=limit)
+        kwargs = plugin_options(module.run_scraper, options)
+        result = module.run_scraper(query, output_file=output_abs_path, limit=limit, **kwargs)
         count = 0
         if isinstance(result, dict):
             if "data" in result and isinstance(result["data"], list):
@@ -75,23 +91,156 @@ def try_run_plugin_direct(site, query, output_abs_path, limit):
         if not os.path.exists(output_abs_path):
             return {"success": False, "error": "Output file not found after plugin run."}
 
-        return {"success": True, "file": output_abs_path, "count": count}
+        output_status = result.get("status") if isinstance(result, dict) else None
+        delta = result.get("delta") if isinstance(result, dict) else None
+        run_metrics = result.get("metrics") if isinstance(result, dict) else None
+        return {"success": True, "file": output_abs_path, "count": count, "output_status": output_status,
+                "delta": delta, "metrics": run_metrics}
     except Exception as e:
         return {"success": False, "error": str(e)}
 
-@app.after_request
-def add_logs_to_response(response):
-    """Store logs in session so they survive redirects."""
-    if log_buffer:
-        logs_text = " || ".join(log_buffer[-50:])
-        session["last_logs"] = logs_text
-        log_buffer.clear()
-    return response
+def build_output_filename(query, site, output_format="csv"):
+    filename_safe = query.lower().replace(" ", "_")
+    date_str = datetime.now().strftime("%d%m%y_%H%M%S")
+    return f"{filename_safe}_{site}_{date_str}.{output_format}"
+
+def count_csv_rows(file_path):
+    """Number of data rows (excluding header) in a CSV file, from its metadata sidecar when present."""
+    meta = read_meta(file_path)
+    if meta and "rows" in meta:
+        return meta["rows"]
+    with open(file_path, newline='', encoding='utf-8') as f:
+        return max(sum(1 for _ in csv.reader(f)) - 1, 0)
+
+def run_scrape(site, query, output_abs_path, limit, options=None):
+    """Run a plugin directly, falling back to runner.py in a subprocess. Used as a job body.
+
+    Delta runs depend on what earlier runs saw, so their output is never cached.
+    """
+    cacheable = not as_bool((options or {}).get("delta"))
+    direct_result = try_run_plugin_direct(site, query, output_abs_path, limit, options)
+    if direct_result.get("success"):
+        count = count_csv_rows(output_abs_path)
+        if cacheable and direct_result.get("output_status") != "partial":
+            result_cache.put(site, query, limit, options, output_abs_path, count)
+        return {
+            "success": True,
+            "file": output_abs_path,
+            "count": count,
+            "output_status": direct_result.get("output_status"),
+            "delta": direct_result.get("delta"),
+            "metrics": direct_result.get("metrics"),
+        }
+
+    command = [
+        "python", "runner.py", "--mode", "modular",
+        "--site", site, "--query", query,
+        "--output", output_abs_path
+    ]
+    if limit is not None:
+        command.extend(["--limit", str(limit)])
+    for key, value in (options or {}).items():
+        command.extend(["--opt", f"{key}={value}"])
+
+    try:
+        result = subprocess.run(command, capture_output=True, text=True, cwd=BASE_DIR)
+    except Exception as e:
+        return {"success": False, "error": f"Scraper execution failed: {e}"}
+
+    output_text = result.stdout.strip()
+    try:
+        result_json = json.loads(output_text.splitlines()[-1] if output_text else "")
+    except json.JSONDecodeError:
+        return {"success": False, "error": f"Failed to parse scraper output: {output_text}"}
+
+    if not result_json.get("success"):
+        return {"success": False, "error": f"Scraper failed: {result_json.get('error', 'Unknown error')}"}
+    if not os.path.exists(output_abs_path):
+        return {"success": False, "error": "Output file not found."}
+    count = count_csv_rows(output_abs_path)
+    output_status = (read_meta(output_abs_path) or {}).get("status")
+    if cacheable and output_status != "partial":
+        result_cache.put(site, query, limit, options, output_abs_path, count)
+    return {"success": True, "file": output_abs_path, "count": count, "output_status": output_status,
+            "delta": result_json.get("delta"), "metrics": result_json.get("metrics")}
+
+def run_fanout(sites, query, output_abs_path, limit, options=None, site_timeout=SITE_TIMEOUT, use_cache=True):
+    """Scrape query on every site concurrently and merge the rows into one output. Used as a job body.
+
+    Each site writes its own CSV (cached like a single-site run); sites still running
+    after site_timeout seconds contribute the rows they have streamed so far.
+    """
+    options = dict(options or {})
+    output_format = options.pop("output_format", "csv")
+    use_cache = use_cache and not as_bool(options.get("delta"))
+    site_paths = {site: os.path.join(STATIC_DIR, build_output_filename(query, site)) for site in sites}
+
+    def run_site(site):
+        cached = result_cache.answer(site, query, limit, options, site_paths[site]) if use_cache else None
+        if cached:
+            site_paths[site] = cached["file"]
+            return cached
+        return run_scrape(site, query, site_paths[site], limit, options)
+
+    results = run_sites(run_site, sites, timeout=site_timeout)
+    summary = {
+        site: {k: result.get(k) for k in ("success", "count", "error", "cached", "timed_out", "seconds", "metrics")
+               if result.get(k) is not None}
+        for site, result in results.items()
+    }
+    if not any(r.get("success") or r.get("timed_out") for r in results.values()):
+        return {"success": False, "error": "; ".join(f"{s}: {r.get('error')}" for s, r in results.items()),
+                "sites": summary}
+
+    writer = merge_outputs(
+        [(site, site_paths[site]) for site in sites], output_abs_path, output_format,
+        meta={"sites": sites, "query": query, "limit": limit, "site_results": summary},
+    )
+    return {
+        "success": True,
+        "file": writer.filepath,
+        "count": writer.rows,
+        "output_status": "partial" if any(not r.get("success") for r in results.values()) else writer.status,
+        "sites": summary,
+    }
+
+def apply_job_result(job):
+    """Copy a finished job's outcome into the session for the index page."""
+    if job["status"] == FAILED:
+        session["message"] = f"❌ {job['error']}"
+        return
+
+    filename = os.path.basename(job["file"])
+    record_count = job["count"]
+    limit = job["limit"]
+    session["message"] = f"Scraping completed. Output saved to static/{filename}"
+    if job.get("output_status") == "partial":
+        session["message"] += "<br>The scrape stopped early; partial results were kept."
+    if record_count > 0:
+        session["total_records"] = record_count
+        session["output_file"] = filename
+        if limit is not None and record_count < limit:
+            session["message"] += f"<br>Only {record_count} records found out of requested {limit}."
+    else:
+        session["message"] += "<br>Output file is empty."
+
+def job_to_json(job):
+    payload = {k: job[k] for k in ("id", "site", "query", "limit", "status", "count", "error",
+                                   "output_status", "delta", "sites", "metrics", "created_at", "started_at",
+                                   "finished_at")}
+    payload["file"] = None
+    payload["file_url"] = None
+    if job["file"]:
+        filename = os.path.basename(job["file"])
+        payload["file"] = f"static/{filename}"
+        payload["file_url"] = abs_url(f"static/{filename}")
+    return payload
 
 @app.route("/debug-logs")
 def debug_logs():
-    """Expose last logs via JSON so browser can print them."""
-    logs_text = session.pop("last_logs", "")
+    """Expose the last logs of the session's finished job (or ?job_id=) via JSON so browser can print them."""
+    job_id = request.args.get("job_id") or session.pop("log_job_id", None)
+    logs_text = " || ".join(log_buffers.lines(job_id, last=50)) if job_id else ""
     if not logs_text:
         return jsonify({"logs_b64": ""})
     logs_b64 = base64.b64encode(logs_text.encode("utf-8")).decode("ascii")
@@ -111,86 +260,66 @@ def index():
         except ValueError:
             limit = None
 
-        if site and query:
-            filename_safe = query.lower().replace(" ", "_")
-            date_str = datetime.now().strftime("%d%m%y_%H%M%S")
-            filename = f"{filename_safe}_{site}_{date_str}.csv"
+        output_format = request.form.get("output_format") or "csv"
+        if output_format not in OUTPUT_FORMATS:
+            output_format = "csv"
+        options = {"output_format": output_format} if output_format != "csv" else None
+
+        if site == ALL_SITES and query:
+            output_abs_path = os.path.join(STATIC_DIR, build_output_filename(query, site, output_format))
+            session["job_id"] = job_manager.submit(
+                run_fanout, site, query, limit,
+                sites=available_plugins, query=query, output_abs_path=output_abs_path, limit=limit, options=options
+            )
+            session.pop("output_file", None)
+            session.pop("total_records", None)
+        elif site and query:
+            filename = build_output_filename(query, site, output_format)
             output_abs_path = os.path.join(STATIC_DIR, filename)
-
-            direct_result = try_run_plugin_direct(site, query, output_abs_path, limit)
-
-            if not direct_result.get("success"):
-                command = [
-                    "python", "runner.py", "--mode", "modular",
-                    "--site", site, "--query", query,
-                    "--output", output_abs_path
-                ]
-                if limit is not None:
-                    command.extend(["--limit", str(limit)])
-
-                try:
-                    result = subprocess.run(command, capture_output=True, text=True)
-                    output_text = result.stdout.strip()
-                    try:
-                        result_json = json.loads(output_text)
-                    except json.JSONDecodeError:
-                        session["message"] = f"Failed to parse scraper output: {output_text}"
-                        return redirect(url_for("index"))
-
-                    if result_json.get("success"):
-                        session["message"] = f"Scraping completed. Output saved to static/{filename}"
-                        if os.path.exists(output_abs_path):
-                            with open(output_abs_path, newline='', encoding='utf-8') as f:
-                                reader = csv.reader(f)
-                                rows = list(reader)
-                                record_count = len(rows) - 1
-                                if record_count > 0:
-                                    session["total_records"] = record_count
-                                    session["output_file"] = filename
-                                    if limit is not None and record_count < limit:
-                                        session["message"] += f"<br>Only {record_count} records found out of requested {limit}."
-                                else:
-                                    session["message"] += "<br>Output file is empty."
-                        else:
-                            session["message"] += "<br>Output file not found."
-                    else:
-                        session["message"] = f"Scraper failed: {result_json.get('error', 'Unknown error')}"
-                except Exception as e:
-                    session["message"] = f"Scraper execution failed: {e}"
-                return redirect(url_for("index"))
-            else:
-                session["message"] = f"Scraping completed. Output saved to static/{filename}"
-                if os.path.exists(output_abs_path):
-                    with open(output_abs_path, newline='', encoding='utf-8') as f:
-                        reader = csv.reader(f)
-                        rows = list(reader)
-                        record_count = len(rows) - 1
-                        if record_count > 0:
-                            session["total_records"] = record_count
-                            session["output_file"] = filename
-                            if limit is not None and record_count < limit:
-                                session["message"] += f"<br>Only {record_count} records found out of requested {limit}."
-                        else:
-                            session["message"] += "<br>Output file is empty."
-                else:
-                    session["message"] += "<br>Output file not found."
+            cached = result_cache.answer(site, query, limit, options, output_abs_path)
+            if cached:
+                session.pop("job_id", None)
+                session.pop("output_file", None)
+                session.pop("total_records", None)
+                apply_job_result(dict(cached, status=DONE, limit=limit))
+                session["message"] += "<br>Served from cache."
                 return redirect(url_for("index"))
+            job_id = job_manager.submit(
+                run_scrape, site, query, limit,
+                site=site, query=query, output_abs_path=output_abs_path, limit=limit, options=options
+            )
+            session["job_id"] = job_id
+            session.pop("output_file", None)
+            session.pop("total_records", None)
+        return redirect(url_for("index"))
+
+    pending_job = None
+    job_id = session.get("job_id")
+    if job_id:
+        job = job_manager.get(job_id)
+        if job is None:
+            session.pop("job_id", None)
+        elif job["status"] in (DONE, FAILED):
+            session.pop("job_id", None)
+            session["log_job_id"] = job_id
+            apply_job_result(job)
+        else:
+            pending_job = job
 
     message = session.pop("message", None)
     output_file = session.get("output_file")
     total_records = session.get("total_records")
-    headers, table_data = (None, None)
-    if output_file:
-        headers, table_data = load_table_data(output_file, max_rows=100)
+    headers = load_table_headers(output_file) if output_file else None
 
     return render_template(
         "index.html",
         message=message,
         output_file=output_file,
         headers=headers,
-        table_data=table_data,
         total_records=total_records,
         available_plugins=available_plugins,
+        output_formats=OUTPUT_FORMATS,
+        pending_job=pending_job,
         timestamp=int(time.time())
     )
 
@@ -201,43 +330,258 @@ def reset():
 
 @app.route("/data/<filename>")
 def get_data(filename):
+    """Rows of an output CSV.
+
+    ?offset=&limit= returns one page, read via a byte-offset row index;
+    ?format=ndjson streams one JSON object per row. Without either, every row is returned.
+    """
     file_path = os.path.join(STATIC_DIR, filename)
     if not os.path.exists(file_path):
         return jsonify({"error": "File not found"}), 404
-    with open(file_path, encoding="utf-8") as f:
-        reader = csv.reader(f)
-        rows = list(reader)
-    return jsonify({"headers": rows[0], "rows": rows[1:]})
+    if not filename.endswith(".csv"):
+        return jsonify({"error": "Paging is only available for CSV output; download the file instead"}), 415
+
+    try:
+        offset = int(request.args.get("offset", 0))
+        limit_raw = request.args.get("limit")
+        limit = int(limit_raw) if limit_raw else None
+    except ValueError:
+        return jsonify({"error": "offset and limit must be integers"}), 400
+
+    if request.args.get("format") == "ndjson":
+        headers = read_headers(file_path)
+
+        def generate():
+            for row in iter_rows(file_path, offset, limit):
+                yield json.dumps(dict(zip(headers, row)), ensure_ascii=False) + "\n"
+        return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+    headers, rows, total = read_page(file_path, offset, limit)
+    return jsonify({"headers": headers, "rows": rows, "offset": offset, "limit": limit, "total": total})
 
 # API endpoints for Chrome extension
 @app.route("/api/plugins", methods=["GET"])
 def api_plugins():
-    return jsonify({"plugins": get_available_plugins()})
+    """Plugin names, plus each plugin's description, output fields and options (read without importing it)."""
+    return jsonify({"plugins": get_available_plugins(), "capabilities": plugin_registry.describe()})
 
 @app.route("/api/scrape", methods=["POST"])
 def api_scrape():
     payload = request.get_json(silent=True) or {}
-    site = payload.get("site")
+    site = payload.get("site") or payload.get("sites")
     query = payload.get("query")
     limit = payload.get("limit")
+    options = payload.get("options") or {}
     if not site or not query:
         return jsonify({"success": False, "error": "site and query are required"}), 400
-
-    filename_safe = query.lower().replace(" ", "_")
-    date_str = datetime.now().strftime("%d%m%y_%H%M%S")
-    filename = f"{filename_safe}_{site}_{date_str}.csv"
+    if not isinstance(options, dict):
+        return jsonify({"success": False, "error": "options must be an object"}), 400
+    try:
+        # The result cache compares limits numerically, so "50" must not reach it as a string.
+        limit = int(limit) if limit is not None else None
+    except (TypeError, ValueError):
+        return jsonify({"success": False, "error": "limit must be an integer"}), 400
+    try:
+        sites = parse_sites(site, get_available_plugins())
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+    output_format = payload.get("output_format") or options.get("output_format") or "csv"
+    if output_format not in OUTPUT_FORMATS:
+        return jsonify({"success": False, "error": f"output_format must be one of {', '.join(OUTPUT_FORMATS)}"}), 400
+    options = dict(options)
+    options.pop("output_format", None)
+    if output_format != "csv":
+        options["output_format"] = output_format
+
+    use_cache = payload.get("cache", True) is not False and "no-cache" not in request.headers.get("Cache-Control", "") \
+        and not as_bool(options.get("delta"))
+
+    if site == ALL_SITES or isinstance(site, list) or len(sites) > 1:
+        try:
+            site_timeout = float(payload.get("site_timeout") or SITE_TIMEOUT)
+        except (TypeError, ValueError):
+            return jsonify({"success": False, "error": "site_timeout must be a number of seconds"}), 400
+        label = ALL_SITES if site == ALL_SITES else "-".join(sites)
+        output_abs_path = os.path.join(STATIC_DIR, build_output_filename(query, label, output_format))
+        job_id = job_manager.submit(
+            run_fanout, label, query, limit,
+            sites=sites, query=query, output_abs_path=output_abs_path, limit=limit, options=options,
+            site_timeout=site_timeout, use_cache=use_cache
+        )
+        return jsonify({
+            "success": True,
+            "job_id": job_id,
+            "status": "queued",
+            "sites": sites,
+            "cached": False,
+            "status_url": abs_url(f"api/jobs/{job_id}"),
+            "events_url": abs_url(f"api/jobs/{job_id}/events")
+        }), 202
+
+    site = sites[0]
+    filename = build_output_filename(query, site, output_format)
     output_abs_path = os.path.join(STATIC_DIR, filename)
-
-    direct_result = try_run_plugin_direct(site, query, output_abs_path, limit)
-    if not direct_result.get("success"):
-        return jsonify({"success": False, "error": direct_result.get("error", "Unknown error")}), 500
-
-    return jsonify({
+    cached = result_cache.answer(site, query, limit, options, output_abs_path) if use_cache else None
+    if cached:
+        cached_name = os.path.basename(cached["file"])
+        response = jsonify({
+            "success": True,
+            "status": "done",
+            "cached": True,
+            "cache_age": cached["cache_age"],
+            "count": cached["count"],
+            "file": f"static/{cached_name}",
+            "file_url": abs_url(f"static/{cached_name}")
+        })
+        response.headers["X-Cache"] = "HIT"
+        response.headers["Age"] = str(int(cached["cache_age"]))
+        return response
+
+    job_id = job_manager.submit(
+        run_scrape, site, query, limit,
+        site=site, query=query, output_abs_path=output_abs_path, limit=limit, options=options
+    )
+    response = jsonify({
         "success": True,
-        "count": direct_result.get("count", 0),
-        "file": f"static/{filename}",
-        "file_url": abs_url(f"static/{filename}")
+        "job_id": job_id,
+        "status": "queued",
+        "cached": False,
+        "status_url": abs_url(f"api/jobs/{job_id}"),
+        "events_url": abs_url(f"api/jobs/{job_id}/events")
     })
+    response.headers["X-Cache"] = "BYPASS" if not use_cache else "MISS"
+    return response, 202
+
+@app.route("/api/results", methods=["GET"])
+def api_results():
+    """Output files with their metadata, read from sidecars rather than the data files."""
+    results = []
+    for name in os.listdir(STATIC_DIR):
+        if not name.endswith(".meta.json"):
+            continue
+        filename = name[:-len(".meta.json")]
+        meta = read_meta(os.path.join(STATIC_DIR, filename))
+        if not meta or not os.path.exists(os.path.join(STATIC_DIR, filename)):
+            continue
+        meta.pop("timings", None)
+        meta["file"] = f"static/{filename}"
+        meta["file_url"] = abs_url(f"static/{filename}")
+        results.append(meta)
+    results.sort(key=lambda m: m.get("finished_at") or 0, reverse=True)
+    return jsonify({"results": results})
+
+@app.route("/api/records", methods=["GET"])
+def api_records():
+    """Search every row ever scraped: ?site=&q=(name prefix)&phone=&url=&since=&run_id=&limit=&offset="""
+    store = get_store()
+    if store is None:
+        return jsonify({"error": "Result store is disabled"}), 404
+    try:
+        since = parse_since(request.args.get("since"))
+        # SQLite reads a negative LIMIT as no limit at all.
+        limit = min(max(0, int(request.args.get("limit", 100))), 1000)
+        offset = max(0, int(request.args.get("offset", 0)))
+    except ValueError:
+        return jsonify({"error": "since must be epoch seconds or an ISO date; limit and offset must be integers"}), 400
+
+    records = store.search(
+        site=request.args.get("site"),
+        q=request.args.get("q"),
+        phone=request.args.get("phone"),
+        url=request.args.get("url"),
+        since=since,
+        run_id=request.args.get("run_id"),
+        limit=limit,
+        offset=offset,
+    )
+    return jsonify({"records": records, "offset": offset, "limit": limit})
+
+@app.route("/api/cache", methods=["GET"])
+def api_cache_stats():
+    return jsonify(result_cache.stats())
+
+@app.route("/api/cache", methods=["DELETE"])
+def api_cache_invalidate():
+    removed = result_cache.invalidate(site=request.args.get("site"), query=request.args.get("query"))
+    return jsonify({"success": True, "removed": removed})
+
+@app.route("/api/jobs", methods=["GET"])
+def api_jobs():
+    return jsonify({"jobs": [job_to_json(j) for j in job_manager.list()]})
+
+@app.route("/api/politeness", methods=["GET"])
+def api_politeness():
+    """Per-domain rate-limit state: tokens, active sessions, backoff and block history."""
+    return jsonify(get_scheduler().state())
+
+@app.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    """Phase timings, rows, failures, retries and blocks per plugin, plus jobs by status, for Prometheus."""
+    jobs_by_status = {}
+    for job in job_manager.list():
+        jobs_by_status[job["status"]] = jobs_by_status.get(job["status"], 0) + 1
+    lines = ["# HELP scraper_jobs Jobs currently tracked by the job manager", "# TYPE scraper_jobs gauge"]
+    lines += [f'scraper_jobs{{status="{status}"}} {n}' for status, n in sorted(jobs_by_status.items())]
+    return Response(metrics.render(lines), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.route("/api/browser-pool", methods=["GET"])
+def api_browser_pool():
+    return jsonify(browser_pool.stats())
+
+@app.route("/api/jobs/<job_id>", methods=["GET"])
+def api_job_status(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"success": False, "error": "Job not found"}), 404
+    return jsonify(job_to_json(job))
+
+@app.route("/api/jobs/<job_id>/events", methods=["GET"])
+def api_job_events(job_id):
+    """Server-Sent Events for a job: status, phase, cards found, fields, each new row, then done.
+
+    Events the job already published are replayed first; a reconnecting EventSource
+    resumes after its Last-Event-ID.
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"success": False, "error": "Job not found"}), 404
+    events = progress.hub.get(job_id)
+    try:
+        after = int(request.headers.get("Last-Event-ID") or request.args.get("after") or 0)
+    except ValueError:
+        after = 0
+
+    def sse(event_id, event, data):
+        return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+    def generate():
+        if events is None:
+            yield sse(0, progress.DONE, {k: job[k] for k in ("status", "count", "error", "output_status")})
+            return
+        last_id = after
+        while True:
+            batch, closed = events.read(last_id)
+            for event_id, event, data in batch:
+                yield sse(event_id, event, data)
+                last_id = event_id
+            if closed and not batch:
+                return
+            if not batch:
+                yield ": keepalive\n\n"
+
+    response = Response(stream_with_context(generate()), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+@app.route("/api/jobs/<job_id>/logs", methods=["GET"])
+def api_job_logs(job_id):
+    """The job's most recent log lines (?last=N, default all kept)."""
+    if job_manager.get(job_id) is None:
+        return jsonify({"success": False, "error": "Job not found"}), 404
+    last = request.args.get("last", type=int)
+    return jsonify({"job_id": job_id, "lines": log_buffers.lines(job_id, last=last)})
 
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 10000))
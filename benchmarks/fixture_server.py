@@ -0,0 +1,253 @@
+# fixture_server.py
+
+"""Serve the captured Google Maps and IndiaMART pages locally, with synthetic infinite scroll.
+
+Scripts, stylesheets and iframes are stripped from the captures so nothing reaches the
+network. A small injected script clones the captured cards: `batch` cards are shown
+at first and each scroll (feed.scrollBy on Maps, window.scrollBy on IndiaMART) adds
+`batch` more after `latency_ms`, up to `cards`. Every clone gets a unique name and
+link, so the plugins' de-duplication sees them as distinct entries. IndiaMART pages
+are also rendered server-side, `batch` cards per `pg` page, for the plugin's HTTP path.
+
+    /maps/search/<query>          google_maps_debug.html
+    /maps/place/<name>/...        minimal place page (tabs mode); panel mode clicks render it in place
+    /search.mp?ss=<query>&pg=<n>  debug_indiamart_best_healthcare.html
+
+Point the plugins at it with GOOGLE_MAPS_BASE_URL / INDIAMART_BASE_URL:
+
+    python benchmarks/fixture_server.py --port 8765 --cards 200
+"""
+
+import argparse
+import copy
+import html
+import os
+import re
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import parse_qs, unquote, urlparse
+from bs4 import BeautifulSoup, Comment
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+MAPS_FIXTURE = os.path.join(BASE_DIR, "google_maps_debug.html")
+INDIAMART_FIXTURE = os.path.join(BASE_DIR, "debug_indiamart_best_healthcare.html")
+
+STRIP_PATTERNS = [
+    re.compile(r"<script\b.*?</script\s*>", re.S | re.I),
+    re.compile(r"<iframe\b.*?</iframe\s*>", re.S | re.I),
+    re.compile(r"<link\b[^>]*>", re.I),
+    re.compile(r"<style\b.*?</style\s*>", re.S | re.I),
+]
+
+# Without the site CSS, the Maps card anchors are empty and zero-sized; panel mode needs to click them.
+MAPS_STYLE = "<style>a.hfpxzc { display: block; min-height: 20px; }</style>"
+
+MAPS_SCRIPT = """
+(() => {
+    const TOTAL = %(cards)d, BATCH = %(batch)d, LATENCY = %(latency_ms)d;
+    const feed = document.querySelector('div[role="feed"]');
+    const originals = Array.from(feed.querySelectorAll('a.hfpxzc')).map((a) => a.closest('.Nv2PK') || a.parentElement);
+    const templates = originals.map((card) => card.cloneNode(true));
+    originals.forEach((card) => card.remove());
+    let next = 0;
+    const add = (n) => {
+        for (let k = 0; k < n && next < TOTAL; k++, next++) {
+            const card = templates[next %% templates.length].cloneNode(true);
+            const a = card.querySelector('a.hfpxzc');
+            const name = a.getAttribute('aria-label') + ' #' + next;
+            a.setAttribute('aria-label', name);
+            const title = card.querySelector('.qBF1Pd');
+            if (title) title.textContent = name;
+            a.setAttribute('href', '/maps/place/' + encodeURIComponent(name) + '/data=!1s0x1:0x' + next.toString(16));
+            feed.appendChild(card);
+        }
+    };
+    add(BATCH);
+    let loading = false;
+    feed.scrollBy = () => {
+        if (loading || next >= TOTAL) return;
+        loading = true;
+        setTimeout(() => { add(BATCH); loading = false; }, LATENCY);
+    };
+    document.addEventListener('click', (event) => {
+        const a = event.target.closest('a.hfpxzc');
+        if (!a) return;
+        event.preventDefault();
+        setTimeout(() => {
+            let panel = document.getElementById('bench-panel');
+            if (!panel) {
+                panel = document.createElement('div');
+                panel.id = 'bench-panel';
+                document.body.prepend(panel);
+            }
+            panel.innerHTML = '<h1 class="DUwDvf lfPIob"></h1><div class="Io6YTe">%(address)s</div>';
+            panel.querySelector('h1').textContent = a.getAttribute('aria-label');
+            history.replaceState(null, '', a.getAttribute('href'));
+        }, LATENCY);
+    }, true);
+})();
+"""
+
+INDIAMART_SCRIPT = """
+(() => {
+    const TOTAL = %(cards)d, BATCH = %(batch)d, LATENCY = %(latency_ms)d;
+    // The server already rendered the first page of cards; scrolling clones more of them.
+    const originals = Array.from(document.querySelectorAll('.supplierInfoDiv'));
+    if (!originals.length) return;
+    const parent = originals[0].parentElement;
+    const templates = originals.map((card) => card.cloneNode(true));
+    let next = originals.length;
+    const add = (n) => {
+        for (let k = 0; k < n && next < TOTAL; k++, next++) {
+            const card = templates[next %% templates.length].cloneNode(true);
+            const link = card.querySelector('.companyname a');
+            if (link) {
+                link.textContent = (link.dataset.baseName || link.textContent.trim()) + ' #' + next;
+                link.setAttribute('href', '/company/' + next);
+            }
+            parent.appendChild(card);
+        }
+    };
+    let loading = false;
+    window.scrollBy = () => {
+        if (loading || next >= TOTAL) return;
+        loading = true;
+        setTimeout(() => { add(BATCH); loading = false; }, LATENCY);
+    };
+})();
+"""
+
+PLACE_PAGE = """<!DOCTYPE html><html><head><meta charset="utf-8"><title>%(name)s</title></head>
+<body><h1 class="DUwDvf lfPIob">%(name)s</h1><div class="Io6YTe">%(address)s</div></body></html>"""
+
+ADDRESS = "12, Bench Street, Fixture City 110001"
+CARDS_SLOT = "bench-cards"
+
+
+def prepare_fixture(path, script, settings, style=""):
+    """Captured page with scripts/styles/iframes removed and the expansion script injected."""
+    with open(path, encoding="utf-8") as f:
+        page = f.read()
+    for pattern in STRIP_PATTERNS:
+        page = pattern.sub("", page)
+    injected = f"{style}<script>{script % settings}</script>"
+    if "</body>" in page:
+        return page.replace("</body>", injected + "</body>", 1)
+    return page + injected
+
+
+def split_cards(page, selector):
+    """Remove the cards matching selector from page; returns (page with a slot comment where they were, cards)."""
+    soup = BeautifulSoup(page, "html.parser")
+    cards = soup.select(selector)
+    cards[0].insert_before(Comment(CARDS_SLOT))
+    cards = [card.extract() for card in cards]
+    return str(soup), cards
+
+
+class FixtureServer:
+    """ThreadingHTTPServer on 127.0.0.1 serving the fixtures; use as a context manager or call start()/stop()."""
+
+    def __init__(self, port=0, cards=100, batch=20, latency_ms=50):
+        self.settings = {"cards": cards, "batch": batch, "latency_ms": latency_ms, "address": ADDRESS}
+        self.latency = latency_ms / 1000
+        self.pages = {
+            "maps": prepare_fixture(MAPS_FIXTURE, MAPS_SCRIPT, self.settings, MAPS_STYLE).encode("utf-8"),
+        }
+        self.indiamart_page, self.indiamart_cards = split_cards(
+            prepare_fixture(INDIAMART_FIXTURE, INDIAMART_SCRIPT, self.settings), ".supplierInfoDiv")
+        self.indiamart_pages = {}
+        self.requests = 0
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    def indiamart(self, page_number):
+        """Result page page_number with cards (page_number - 1) * batch onwards, renamed like the scroll clones."""
+        if page_number not in self.indiamart_pages:
+            batch, total = self.settings["batch"], self.settings["cards"]
+            cards = []
+            for i in range((page_number - 1) * batch, min(page_number * batch, total)):
+                card = copy.copy(self.indiamart_cards[i % len(self.indiamart_cards)])
+                link = card.select_one(".companyname a")
+                if link:
+                    base_name = link.get_text(strip=True)
+                    link.string = f"{base_name} #{i}"
+                    link["href"] = f"/company/{i}"
+                    link["data-base-name"] = base_name
+                cards.append(str(card))
+            page = self.indiamart_page.replace(f"<!--{CARDS_SLOT}-->", "".join(cards), 1)
+            self.indiamart_pages[page_number] = page.encode("utf-8")
+        return self.indiamart_pages[page_number]
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests += 1
+                url = urlparse(self.path)
+                path = url.path
+                if path.startswith("/maps/search/"):
+                    body = server.pages["maps"]
+                elif path.startswith("/search.mp"):
+                    page_number = int(parse_qs(url.query).get("pg", ["1"])[0])
+                    body = server.indiamart(max(1, page_number))
+                elif path.startswith("/maps/place/"):
+                    time.sleep(server.latency)
+                    name = html.escape(unquote(path.split("/")[3]))
+                    body = (PLACE_PAGE % {"name": name, "address": ADDRESS}).encode("utf-8")
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve scraper fixtures locally")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--cards", type=int, default=100)
+    parser.add_argument("--batch", type=int, default=20)
+    parser.add_argument("--latency-ms", type=int, default=50)
+    args = parser.parse_args()
+
+    server = FixtureServer(args.port, args.cards, args.batch, args.latency_ms)
+    print(f"Serving fixtures on {server.base_url} (Ctrl+C to stop)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
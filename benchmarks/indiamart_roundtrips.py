@@ -0,0 +1,126 @@
+# indiamart_roundtrips.py
+
+"""Count Playwright round trips per scroll for IndiaMART card extraction, before and after.
+
+Loads the captured debug_indiamart_best_healthcare.html with all network aborted,
+clones its cards up to --cards, and reveals them --batch at a time to mimic infinite
+scroll. Each "scroll" runs both the old loop (query_selector_all + extract_card_data
+on every card seen so far) and the new cursor-based extract_cards_after.
+
+    python benchmarks/indiamart_roundtrips.py --cards 60 --batch 10
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from playwright.sync_api import ElementHandle
+from plugins.indiamart import extract_card_data, extract_cards_after
+from utils.browser_pool import get_pool
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+FIXTURE = os.path.join(BASE_DIR, "debug_indiamart_best_healthcare.html")
+
+# Clone the captured cards up to `total`, then detach everything so cards can be revealed in batches.
+PREPARE_JS = """
+(total) => {
+    const originals = Array.from(document.querySelectorAll('.supplierInfoDiv'));
+    const parent = originals[0].parentElement;
+    const pool = [];
+    for (let i = 0; pool.length < total; i++) {
+        const card = originals[i % originals.length].cloneNode(true);
+        const name = card.querySelector('.companyname a');
+        if (name) name.textContent = name.textContent + ' #' + pool.length;
+        pool.push(card);
+    }
+    originals.forEach((card) => card.remove());
+    window.__benchCards = pool;
+    window.__benchParent = parent;
+}
+"""
+REVEAL_JS = "(n) => window.__benchCards.splice(0, n).forEach((c) => window.__benchParent.appendChild(c))"
+
+
+class RoundTripCounter:
+    """Wrap Playwright objects and count every method call made through them."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def wrap(self, obj):
+        counter = self
+
+        class Counted:
+            def __getattr__(self, name):
+                attr = getattr(obj, name)
+                if not callable(attr):
+                    return attr
+
+                def call(*args, **kwargs):
+                    counter.calls += 1
+                    return counter._wrap_result(attr(*args, **kwargs))
+                return call
+
+        return Counted()
+
+    def _wrap_result(self, result):
+        if isinstance(result, ElementHandle):
+            return self.wrap(result)
+        if isinstance(result, list):
+            return [self.wrap(r) if isinstance(r, ElementHandle) else r for r in result]
+        return result
+
+
+def old_round(page, counter):
+    cards = counter.wrap(page).query_selector_all(".supplierInfoDiv")
+    for card in cards:
+        extract_card_data(card)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="IndiaMART extraction round-trip benchmark")
+    parser.add_argument("--cards", type=int, default=60)
+    parser.add_argument("--batch", type=int, default=10)
+    args = parser.parse_args()
+
+    with open(FIXTURE, encoding="utf-8") as f:
+        html = f.read()
+
+    with get_pool().page() as page:
+        page.route("**/*", lambda route: route.abort())
+        page.set_content(html, wait_until="domcontentloaded")
+        page.evaluate(PREPARE_JS, args.cards)
+
+        print(f"{'scroll':>6} {'cards':>6} {'old trips':>10} {'old ms':>8} {'new trips':>10} {'new ms':>8}")
+        totals = {"old": 0, "new": 0}
+        cursor = 0
+        scroll = 0
+        while True:
+            page.evaluate(REVEAL_JS, args.batch)
+            on_page = page.evaluate("() => document.querySelectorAll('.supplierInfoDiv').length")
+            if scroll and on_page == cursor:
+                break
+            scroll += 1
+
+            old = RoundTripCounter()
+            started = time.perf_counter()
+            old_round(page, old)
+            old_ms = (time.perf_counter() - started) * 1000
+
+            new = RoundTripCounter()
+            started = time.perf_counter()
+            cursor, _ = extract_cards_after(new.wrap(page), cursor)
+            new_ms = (time.perf_counter() - started) * 1000
+
+            totals["old"] += old.calls
+            totals["new"] += new.calls
+            print(f"{scroll:>6} {on_page:>6} {old.calls:>10} {old_ms:>8.1f} {new.calls:>10} {new_ms:>8.1f}")
+
+        print(f"total round trips: old={totals['old']} new={totals['new']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+# offline_suite.py
+
+"""Benchmark the plugins end to end against local fixtures, without touching live sites.
+
+Starts benchmarks/fixture_server.py, points the plugins at it through
+GOOGLE_MAPS_BASE_URL / INDIAMART_BASE_URL and runs each scenario (google_maps in
+list, tabs and panel mode, indiamart through the browser and over plain HTTP) for
+--cards cards. For every scenario it reports per-phase timings, cards/sec,
+Playwright round trips (messages sent to the driver) and peak RSS of Python and
+Chromium, and saves everything as JSON under benchmarks/results/ tagged with the
+current commit.
+
+    python benchmarks/offline_suite.py --cards 100 --latency-ms 50
+    python benchmarks/offline_suite.py --compare benchmarks/results/<earlier run>.json
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Rate limiting and the result store would only add noise to the numbers.
+os.environ.setdefault("POLITENESS_ENABLED", "0")
+os.environ.setdefault("RESULTS_DB_ENABLED", "0")
+
+from fixture_server import FixtureServer
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+RESULTS_DIR = os.path.join(BASE_DIR, "benchmarks", "results")
+SCENARIOS = ["google_maps:list", "google_maps:tabs", "google_maps:panel", "indiamart:browser", "indiamart:http"]
+
+
+class RoundTripCounter:
+    """Count messages the Playwright client sends to its driver (one per API round trip)."""
+
+    def __init__(self):
+        self.calls = 0
+        self.original = None
+        try:
+            from playwright._impl._connection import Connection
+            self.connection_class = Connection
+        except ImportError:
+            self.connection_class = None
+
+    def __enter__(self):
+        if self.connection_class is None or not hasattr(self.connection_class, "_send_message_to_server"):
+            self.calls = None
+            return self
+        self.original = self.connection_class._send_message_to_server
+        counter = self
+
+        def counted(*args, **kwargs):
+            counter.calls += 1
+            return counter.original(*args, **kwargs)
+
+        self.connection_class._send_message_to_server = counted
+        return self
+
+    def __exit__(self, *exc):
+        if self.original is not None:
+            self.connection_class._send_message_to_server = self.original
+        return False
+
+
+class RSSSampler:
+    """Sample Chromium's resident memory in the background and keep the peak."""
+
+    def __init__(self, interval=0.2):
+        self.interval = interval
+        self.peak_mb = 0
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        from utils.browser_pool import chromium_rss_mb
+        while not self.stopping.is_set():
+            self.peak_mb = max(self.peak_mb, chromium_rss_mb())
+            self.stopping.wait(self.interval)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stopping.set()
+        self.thread.join()
+        return False
+
+
+def python_peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // 1024
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run_scenario(scenario, cards, output_dir):
+    from utils.plugin_registry import get_registry
+
+    site, _, mode = scenario.partition(":")
+    module = get_registry().load(site)
+    kwargs = {"mode": mode} if mode else {}
+    output_file = os.path.join(output_dir, f"{scenario.replace(':', '_')}.csv")
+
+    with RoundTripCounter() as trips, RSSSampler() as rss:
+        started = time.perf_counter()
+        result = module.run_scraper("benchmark", output_file=output_file, limit=cards, **kwargs)
+        seconds = time.perf_counter() - started
+
+    waits = result.get("waits") or {}
+    wait_seconds = sum(w["total"] for w in waits.values())
+    count = result.get("count", 0)
+    return {
+        "scenario": scenario,
+        "cards": count,
+        "status": result.get("status"),
+        "error": result.get("error"),
+        "cards_per_sec": round(count / seconds, 2) if seconds else 0,
+        "phases": {
+            "scrape_seconds": round(seconds, 3),
+            "wait_seconds": round(wait_seconds, 3),
+            "work_seconds": round(seconds - wait_seconds, 3),
+        },
+        "waits": waits,
+        "round_trips": trips.calls,
+        "round_trips_per_card": round(trips.calls / count, 2) if trips.calls is not None and count else None,
+        "peak_rss_mb": {"chromium": rss.peak_mb, "python": python_peak_rss_mb()},
+        "network": result.get("network"),
+    }
+
+
+def compare(current, previous_path):
+    with open(previous_path, encoding="utf-8") as f:
+        previous = {r["scenario"]: r for r in json.load(f)["results"]}
+    print(f"\nvs {os.path.basename(previous_path)}:")
+    for result in current["results"]:
+        before = previous.get(result["scenario"])
+        if not before or not before["cards_per_sec"]:
+            continue
+        change = (result["cards_per_sec"] - before["cards_per_sec"]) / before["cards_per_sec"] * 100
+        print(f"  {result['scenario']:<20} cards/sec {before['cards_per_sec']:>8} -> {result['cards_per_sec']:>8}"
+              f" ({change:+.1f}%), round trips {before['round_trips']} -> {result['round_trips']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline plugin benchmark against local fixtures")
+    parser.add_argument("--cards", type=int, default=100, help="Cards to expand each result page to")
+    parser.add_argument("--batch", type=int, default=20, help="Cards added per scroll")
+    parser.add_argument("--latency-ms", type=int, default=50, help="Simulated latency per scroll/place load")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        help=f"Comma-separated, from: {', '.join(SCENARIOS)}")
+    parser.add_argument("--output", help="Results JSON path (default: benchmarks/results/<time>-<commit>.json)")
+    parser.add_argument("--compare", metavar="JSON", help="Earlier results file to compare against")
+    args = parser.parse_args()
+
+    with FixtureServer(cards=args.cards, batch=args.batch, latency_ms=args.latency_ms) as server:
+        os.environ["GOOGLE_MAPS_BASE_URL"] = server.base_url
+        os.environ["INDIAMART_BASE_URL"] = server.base_url
+        from utils.browser_pool import get_pool
+
+        started = time.perf_counter()
+        with get_pool().page():
+            pass
+        launch_seconds = round(time.perf_counter() - started, 3)
+
+        results = []
+        with tempfile.TemporaryDirectory() as output_dir:
+            for scenario in args.scenarios.split(","):
+                result = run_scenario(scenario.strip(), args.cards, output_dir)
+                results.append(result)
+                print(f"{result['scenario']:<20} {result['cards']:>5} cards {result['phases']['scrape_seconds']:>7}s"
+                      f" {result['cards_per_sec']:>8} cards/s  trips={result['round_trips']}"
+                      f"  chromium={result['peak_rss_mb']['chromium']}MB")
+        get_pool().close()
+
+    commit = git_commit()
+    report = {
+        "commit": commit,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "settings": {"cards": args.cards, "batch": args.batch, "latency_ms": args.latency_ms},
+        "browser_launch_seconds": launch_seconds,
+        "results": results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{commit or 'nogit'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved {output}")
+
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
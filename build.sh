@@ -5,7 +5,7 @@ echo "Installing Python dependencies..."
 pip install -r requirements.txt
 
 echo "Installing Playwright Chromium..."
-python -m playwright install chromium
+python runner.py --install-browsers
 
 
 
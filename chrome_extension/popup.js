@@ -4,6 +4,9 @@ const limitInp = document.getElementById("limit");
 const goBtn = document.getElementById("go");
 const statusEl = document.getElementById("status");
 const resultEl = document.getElementById("result");
+const rowsEl = document.getElementById("rows");
+
+const LIVE_ROW_LIMIT = 200;
 
 function setStatus(msg) {
   statusEl.textContent = msg || "";
@@ -22,6 +25,75 @@ async function getBackend() {
   });
 }
 
+function sleep(ms) {
+  return new Promise((resolve) => setTimeout(resolve, ms));
+}
+
+async function waitForJob(statusUrl) {
+  while (true) {
+    const res = await fetch(statusUrl);
+    const job = await res.json();
+    if (job.status === "done" || job.status === "failed" || !res.ok) {
+      return job;
+    }
+    setStatus(`Job ${job.status}… this can take a bit.`);
+    await sleep(2000);
+  }
+}
+
+function addRow(source, row) {
+  if (rowsEl.childElementCount >= LIVE_ROW_LIMIT) return;
+  const values = Object.values(row).filter((v) => v && v !== "N/A" && !String(v).startsWith("http"));
+  const line = document.createElement("div");
+  const prefix = siteSel.value === "all" ? `[${source}] ` : "";
+  line.textContent = prefix + values.join(" · ");
+  rowsEl.appendChild(line);
+}
+
+// Follow the job's Server-Sent Events, showing rows as they are extracted.
+// Resolves with the finished job, or null if the stream could not be used.
+function streamJob(eventsUrl, statusUrl) {
+  return new Promise((resolve) => {
+    if (!eventsUrl || !window.EventSource) {
+      resolve(null);
+      return;
+    }
+    const source = new EventSource(eventsUrl);
+    const progress = { phase: "queued", cards: {}, rows: 0, opened: false };
+    const show = () => {
+      const found = Object.values(progress.cards).reduce((a, b) => a + b, 0);
+      setStatus(`${progress.phase}… ${found} cards found, ${progress.rows} rows collected`);
+    };
+    const data = (event) => JSON.parse(event.data);
+
+    source.onopen = () => { progress.opened = true; };
+    source.addEventListener("status", (event) => { progress.phase = data(event).status; show(); });
+    source.addEventListener("phase", (event) => { progress.phase = data(event).phase; show(); });
+    source.addEventListener("cards", (event) => {
+      const d = data(event);
+      progress.cards[d.source] = d.found;
+      show();
+    });
+    source.addEventListener("row", (event) => {
+      const d = data(event);
+      progress.rows += 1;
+      addRow(d.source, d.row);
+      show();
+    });
+    source.addEventListener("done", async () => {
+      source.close();
+      const res = await fetch(statusUrl);
+      resolve(await res.json());
+    });
+    source.onerror = () => {
+      if (!progress.opened) {
+        source.close();
+        resolve(null);
+      }
+    };
+  });
+}
+
 async function loadPlugins() {
   const backend = await getBackend();
   setStatus("Loading plugins...");
@@ -35,6 +107,12 @@ async function loadPlugins() {
       opt.textContent = p;
       siteSel.appendChild(opt);
     });
+    if ((data.plugins || []).length > 1) {
+      const all = document.createElement("option");
+      all.value = "all";
+      all.textContent = "all sites";
+      siteSel.appendChild(all);
+    }
     setStatus("");
   } catch (e) {
     setStatus("Failed to load plugins. Check backend URL in Settings.");
@@ -53,6 +131,7 @@ goBtn.addEventListener("click", async () => {
 
   setStatus("Running… this can take a bit.");
   setResultLink("");
+  rowsEl.innerHTML = "";
 
   goBtn.disabled = true;
   try {
@@ -69,9 +148,17 @@ goBtn.addEventListener("click", async () => {
 
     if (!data.success) {
       setStatus(`Error: ${data.error || "Unknown error"}`);
+      return;
+    }
+
+    const job = data.status === "done"
+      ? data
+      : (await streamJob(data.events_url, data.status_url)) || (await waitForJob(data.status_url));
+    if (job.status !== "done") {
+      setStatus(`Error: ${job.error || "Unknown error"}`);
     } else {
-      setStatus(`Done. ${data.count || 0} rows.`);
-      setResultLink(data.file_url);
+      setStatus(`Done. ${job.count || 0} rows${job.cached ? " (cached)" : ""}.`);
+      setResultLink(job.file_url);
     }
   } catch (e) {
     setStatus(`Request failed: ${e.message}`);
@@ -3,37 +3,95 @@
 # import subprocess
 # subprocess.run(["python", "-m", "playwright", "install", "chromium"], check=True)
 
-import time
-import csv
 import os
 import re
-from urllib.parse import quote_plus
-from playwright.sync_api import sync_playwright
+from collections import deque
+from urllib.parse import quote_plus, urlparse
+from utils import metrics, progress
+from utils.browser_pool import get_pool
 from utils.logger import get_logger
+from utils.network_policy import NetworkPolicy, ANALYTICS_PATTERNS
+from utils.output import open_writer
+from utils.politeness import get_scheduler, BlockedError
+from utils.seen_keys import SeenKeys, UNCHANGED, as_bool
+from utils.waits import Waiter
 
 logger = get_logger("google_maps")
 description = "Scrape business data from Google Maps search results"
 
-def scroll_feed(page):
-    """Scroll the results feed to load more cards."""
-    try:
-        page.evaluate("document.querySelector('div[role=\"feed\"]').scrollBy(0, 1000)")
-    except:
-        logger.warning("Could not scroll feed. Possibly no more results.")
-    time.sleep(2)
+MODES = ("tabs", "panel", "list")
+DEFAULT_MODE = os.getenv("GOOGLE_MAPS_MODE", "panel")
+DETAIL_CONCURRENCY = int(os.getenv("GOOGLE_MAPS_CONCURRENCY", "4"))
+SCROLL_WAIT_MS = 3000
+# Overridable so benchmarks can point the plugin at a local fixture server.
+BASE_URL = os.getenv("GOOGLE_MAPS_BASE_URL", "https://www.google.com").rstrip("/")
+DOMAIN = urlparse(BASE_URL).hostname
+PANEL_WAIT_MS = 5000
+# Caps for letting a place's details finish rendering (panel) or loading (detail tab) once its name is shown.
+PANEL_SELECTOR = "div[role='main']"
+PANEL_SETTLE_MS = 1000
+PLACE_IDLE_MS = 1000
+
+FIELDS = ["Name", "URL", "Address"]
+LIST_FIELDS = ["Name", "URL", "Address", "Rating", "Reviews"]
+COLUMN_TYPES = {"Rating": "float", "Reviews": "int"}
+
+# Reads every feed card in one round trip. The first info line of a card is
+# "Category · short address"; rating and review count sit in MW4etd/UY7F9.
+FEED_CARDS_JS = """
+() => Array.from(document.querySelectorAll('a.hfpxzc')).map((a) => {
+    const card = a.closest('.Nv2PK') || a.parentElement;
+    const text = (el) => (el ? el.textContent.trim() : '');
+    const info = Array.from(card.querySelectorAll('.W4Efsd .W4Efsd'))
+        .map((line) => line.textContent.split('·').map((part) => part.trim()).filter(Boolean));
+    const first = info[0] || [];
+    return {
+        Name: (a.getAttribute('aria-label') || text(card.querySelector('.qBF1Pd')) || 'N/A').trim(),
+        URL: a.href || 'N/A',
+        Address: first.length > 1 ? first[first.length - 1] : 'N/A',
+        Rating: text(card.querySelector('.MW4etd')) || 'N/A',
+        Reviews: text(card.querySelector('.UY7F9')).replace(/[()]/g, '') || 'N/A',
+    };
+})
+"""
+
+# Map tiles, photos, fonts and video are never read by the scraper.
+NETWORK_POLICY = NetworkPolicy(
+    block_resource_types=["image", "media", "font"],
+    block_url_patterns=ANALYTICS_PATTERNS + [r"/maps/vt\b", r"/kh/v=", r"/maps/preview/log", r"/gen_204"],
+)
+
+def scroll_feed(page, waiter=None):
+    """Scroll the results feed and wait until more cards load (or SCROLL_WAIT_MS passes).
+
+    Returns True if new cards appeared.
+    """
+    waiter = waiter or Waiter(page)
+    get_scheduler().wait(DOMAIN)
+    with metrics.phase("scroll"):
+        try:
+            cards_before = page.evaluate(
+                "() => { document.querySelector('div[role=\"feed\"]').scrollBy(0, 1000);"
+                " return document.querySelectorAll('a.hfpxzc').length; }"
+            )
+        except:
+            logger.warning("Could not scroll feed. Possibly no more results.")
+            return False
+        return waiter.count_grows("a.hfpxzc", cards_before, timeout_ms=SCROLL_WAIT_MS)
 
 def extract_card_data(page):
     """Extract data from the currently opened side panel."""
-    try:
-        name = page.locator("h1.DUwDvf.lfPIob").inner_text().strip()
-    except:
-        name = "N/A"
+    with metrics.phase("extract_card"):
+        try:
+            name = page.locator("h1.DUwDvf.lfPIob").inner_text().strip()
+        except:
+            name = "N/A"
 
-    try:
-        all_texts = page.locator("div.Io6YTe").all_inner_texts()
-        address = next((t.strip() for t in all_texts if "," in t and any(c.isdigit() for c in t)), "N/A")
-    except:
-        address = "N/A"
+        try:
+            all_texts = page.locator("div.Io6YTe").all_inner_texts()
+            address = next((t.strip() for t in all_texts if "," in t and any(c.isdigit() for c in t)), "N/A")
+        except:
+            address = "N/A"
 
     place_url = page.url
     return {"Name": name, "URL": place_url, "Address": address}
@@ -44,85 +102,248 @@ def normalize_key(*values):
         return re.sub(r"\s+", " ", v.strip().lower())
     return tuple(clean(str(v)) for v in values)
 
-def save_to_csv(data, filepath):
-    os.makedirs(os.path.dirname(filepath), exist_ok=True)
-    with open(filepath, "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=["Name", "URL", "Address"])
-        writer.writeheader()
-        writer.writerows(data)
-    logger.info(f"Scraping completed. Output saved to {filepath}")
-    return filepath
+def place_key(href):
+    """Stable id of a place link: its feature id (!1s0x...:0x...) or the URL without query string."""
+    match = re.search(r"!1s(0x[0-9a-f]+:0x[0-9a-f]+)", href or "")
+    return match.group(1) if match else (href or "").split("?")[0]
+
+def extract_places_concurrently(context, hrefs, concurrency, timeout_ms=15000, waiter=None):
+    """Open place URLs in a bounded set of tabs and extract them, keeping input order.
+
+    Navigations are started with wait_until="commit", so up to `concurrency` place
+    pages keep loading in the browser while we read the one that is ready. Tab waits
+    are recorded in waiter's timings when one is given.
+    """
+    results = [None] * len(hrefs)
+    pending = deque(enumerate(hrefs))
+    in_flight = deque()
+    tabs = [context.new_page() for _ in range(min(concurrency, len(hrefs)))]
+    timings = waiter.timings if waiter is not None else None
+    tab_waiters = {tab: Waiter(tab, timings=timings) for tab in tabs}
+
+    def start_next(tab):
+        while pending:
+            idx, href = pending.popleft()
+            try:
+                get_scheduler().goto(tab, href, wait_until="commit", timeout=timeout_ms)
+                in_flight.append((tab, idx))
+                return
+            except BlockedError:
+                raise
+            except Exception as e:
+                metrics.count("card_failures")
+                logger.warning(f"Failed to open place {href}: {e}")
 
-def run_scraper(query, output_file=None, limit=None):
-    target_count = limit if limit is not None else 40
-    timeout_ms = 180000 if limit is None else 60000
+    try:
+        for tab in tabs:
+            start_next(tab)
+        while in_flight:
+            tab, idx = in_flight.popleft()
+            try:
+                with metrics.phase("wait_selector"):
+                    tab.wait_for_selector("h1.DUwDvf", timeout=timeout_ms)
+                tab_waiters[tab].network_idle(timeout_ms=PLACE_IDLE_MS)
+                results[idx] = extract_card_data(tab)
+            except Exception as e:
+                metrics.count("card_failures")
+                logger.warning(f"Failed to process a place page: {e}")
+            start_next(tab)
+    finally:
+        for tab in tabs:
+            tab.close()
+    return results
+
+def collect_with_tabs(page, waiter, writer, target_count, max_scrolls, concurrency, delta=None):
+    """Gather place hrefs from the feed and extract them in parallel tabs.
+
+    With delta, places known from earlier runs are skipped before their page is opened.
+    """
+    seen_entries = set()
+    visited_hrefs = set()
+    scrolls_done = 0
+    last_cards_count = 0
+
+    while writer.rows < target_count and scrolls_done < max_scrolls:
+        try:
+            with metrics.phase("wait_selector"):
+                page.wait_for_selector("a.hfpxzc", timeout=15000)
+        except:
+            logger.warning("⚠ No result cards found.")
+            break
+
+        hrefs = page.eval_on_selector_all("a.hfpxzc", "els => els.map(e => e.href)")
+        logger.info(f"Found {len(hrefs)} cards on scroll #{scrolls_done + 1}")
+        progress.publish(progress.CARDS, source="google_maps", found=len(hrefs), scroll=scrolls_done + 1)
+
+        new_hrefs = []
+        for href in hrefs:
+            if href and href not in visited_hrefs and href not in new_hrefs:
+                if delta and delta.known(place_key(href)):
+                    visited_hrefs.add(href)
+                    continue
+                new_hrefs.append(href)
+        # Hrefs past the limit stay unvisited so a later scroll can still schedule them.
+        new_hrefs = new_hrefs[:target_count - writer.rows]
+        visited_hrefs.update(new_hrefs)
+        logger.info(f"New cards to process: {len(new_hrefs)}")
+
+        places = extract_places_concurrently(page.context, new_hrefs, concurrency, waiter=waiter)
+        for href, data in zip(new_hrefs, places):
+            if not data or writer.rows >= target_count:
+                continue
+            if delta and delta.observe((place_key(href),), data) == UNCHANGED:
+                continue
+            entry_key = normalize_key(data["Name"], data["URL"])
+            if entry_key not in seen_entries:
+                writer.write(data)
+                seen_entries.add(entry_key)
+                logger.info(f"Collected: {data['Name']}")
 
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True, args=["--disable-blink-features=AutomationControlled"])
-        page = browser.new_page()
+        if writer.rows >= target_count:
+            break
 
-        search_url = f"https://www.google.com/maps/search/{quote_plus(query)}"
-        logger.info(f"Navigating to {search_url}")
-        page.goto(search_url, timeout=timeout_ms)
+        scroll_feed(page, waiter)
+        scrolls_done += 1
+        if not new_hrefs and len(hrefs) == last_cards_count:
+            logger.info("ℹ No new cards loaded after scrolling, ending.")
+            break
+        last_cards_count = len(hrefs)
 
-        collected = []
-        seen_entries = set()
-        visited_hrefs = set()
+    return writer.rows
 
-        max_scrolls = 40 if limit is None else 20
-        scrolls_done = 0
-        last_cards_count = 0
+def collect_with_list(page, waiter, writer, target_count, max_scrolls, delta=None):
+    """Read name, URL, rating and short address straight off the feed cards, never opening a place.
 
-        while len(collected) < target_count and scrolls_done < max_scrolls:
-            try:
-                page.wait_for_selector("a.hfpxzc", timeout=15000)
-            except:
-                logger.warning("⚠ No result cards found.")
+    With delta, only cards that are new or whose row changed since the last run are written.
+    """
+    seen_entries = set()
+    scrolls_done = 0
+
+    try:
+        with metrics.phase("wait_selector"):
+            page.wait_for_selector("a.hfpxzc", timeout=15000)
+    except:
+        logger.warning("⚠ No result cards found.")
+        return writer.rows
+
+    while writer.rows < target_count and scrolls_done < max_scrolls:
+        with metrics.phase("extract_cards"):
+            cards = page.evaluate(FEED_CARDS_JS)
+        new_count = 0
+        for data in cards:
+            if writer.rows >= target_count:
                 break
+            if delta and delta.observe((place_key(data["URL"]),), data) == UNCHANGED:
+                continue
+            entry_key = normalize_key(data["Name"], data["URL"])
+            if entry_key not in seen_entries:
+                writer.write(data)
+                seen_entries.add(entry_key)
+                new_count += 1
+        logger.info(f"Found {len(cards)} cards on scroll #{scrolls_done + 1}, {new_count} new")
+        progress.publish(progress.CARDS, source="google_maps", found=len(cards), scroll=scrolls_done + 1)
+
+        if writer.rows >= target_count:
+            break
+
+        grew = scroll_feed(page, waiter)
+        scrolls_done += 1
+        if not grew:
+            logger.info("ℹ No new cards loaded after scrolling, ending.")
+            break
+
+    return writer.rows
+
+def collect_with_panel(page, waiter, writer, target_count, max_scrolls, delta=None):
+    """Click each card and read the side panel, one card at a time.
+
+    With delta, cards known from earlier runs are skipped without clicking them.
+    """
+    seen_entries = set()
+    visited_hrefs = set()
+    scrolls_done = 0
+    last_cards_count = 0
+
+    while writer.rows < target_count and scrolls_done < max_scrolls:
+        try:
+            with metrics.phase("wait_selector"):
+                page.wait_for_selector("a.hfpxzc", timeout=15000)
+        except:
+            logger.warning("⚠ No result cards found.")
+            break
 
-            cards = page.locator("a.hfpxzc").all()
-            logger.info(f"Found {len(cards)} cards on scroll #{scrolls_done + 1}")
+        cards = page.locator("a.hfpxzc").all()
+        logger.info(f"Found {len(cards)} cards on scroll #{scrolls_done + 1}")
+        progress.publish(progress.CARDS, source="google_maps", found=len(cards), scroll=scrolls_done + 1)
 
-            new_cards = [c for c in cards if c.get_attribute("href") not in visited_hrefs]
-            logger.info(f"New cards to process: {len(new_cards)}")
+        new_cards = [c for c in cards if c.get_attribute("href") not in visited_hrefs]
+        logger.info(f"New cards to process: {len(new_cards)}")
 
-            if not new_cards:
-                scroll_feed(page)
-                scrolls_done += 1
-                if len(cards) == last_cards_count:
-                    logger.info("ℹ No new cards loaded after scrolling, ending.")
-                    break
-                last_cards_count = len(cards)
+        if not new_cards:
+            scroll_feed(page, waiter)
+            scrolls_done += 1
+            if len(cards) == last_cards_count:
+                logger.info("ℹ No new cards loaded after scrolling, ending.")
+                break
+            last_cards_count = len(cards)
+            continue
+
+        for card in new_cards:
+            href = card.get_attribute("href")
+            if not href:
+                continue
+            if delta and delta.known(place_key(href)):
+                visited_hrefs.add(href)
                 continue
 
-            for card in new_cards:
-                href = card.get_attribute("href")
-                if not href:
+            try:
+                previous_name = page.evaluate(
+                    "() => { const h = document.querySelector('h1.DUwDvf'); return h ? h.textContent.trim() : ''; }"
+                )
+                get_scheduler().wait(DOMAIN)
+                card.click()
+                waiter.selector_changes("h1.DUwDvf", previous_name, timeout_ms=PANEL_WAIT_MS)
+                waiter.dom_settles(PANEL_SELECTOR, quiet_ms=200, timeout_ms=PANEL_SETTLE_MS)
+                data = extract_card_data(page)
+                visited_hrefs.add(href)
+                if delta and delta.observe((place_key(href),), data) == UNCHANGED:
                     continue
 
-                try:
-                    card.click()
-                    page.wait_for_timeout(2000)
-                    data = extract_card_data(page)
+                entry_key = normalize_key(data["Name"], data["URL"])
+                if entry_key not in seen_entries:
+                    writer.write(data)
+                    seen_entries.add(entry_key)
+                    logger.info(f"Collected: {data['Name']}")
 
-                    entry_key = normalize_key(data["Name"], data["URL"])
-                    if entry_key not in seen_entries:
-                        collected.append(data)
-                        seen_entries.add(entry_key)
-                        logger.info(f"Collected: {data['Name']}")
+                if writer.rows >= target_count:
+                    break
+            except Exception as e:
+                metrics.count("card_failures")
+                logger.warning(f"Failed to process a card: {e}")
+                continue
 
-                    visited_hrefs.add(href)
+        scroll_feed(page, waiter)
+        scrolls_done += 1
 
-                    if len(collected) >= target_count:
-                        break
-                except Exception as e:
-                    logger.warning(f"Failed to process a card: {e}")
-                    continue
+    return writer.rows
 
-            scroll_feed(page)
-            scrolls_done += 1
+def run_scraper(query, output_file=None, limit=None, mode=DEFAULT_MODE, concurrency=DETAIL_CONCURRENCY,
+                output_format="csv", delta=False):
+    """Scrape Google Maps results for query.
 
-        browser.close()
+    mode="tabs" opens place pages in `concurrency` parallel tabs; mode="panel" clicks
+    each card and reads the side panel sequentially; mode="list" only reads the feed
+    cards (adds Rating and Reviews, much faster, address is the short feed line).
+    output_format is one of utils.output.OUTPUT_FORMATS ("csv", "csv.gz", "jsonl", "parquet").
+    delta=True skips places already scraped for this query and writes only new or
+    changed rows; limit then counts those rows.
+    """
+    target_count = limit if limit is not None else 40
+    timeout_ms = 180000 if limit is None else 60000
+    max_scrolls = 40 if limit is None else 20
+
+    if mode not in MODES:
+        raise ValueError(f"Unknown mode {mode!r}, expected one of {', '.join(MODES)}")
 
     if not output_file:
             safe_query = query.replace(" ", "_")
@@ -131,9 +352,57 @@ def run_scraper(query, output_file=None, limit=None):
         # Ensure absolute path always
         output_file = os.path.abspath(output_file)
 
-    os.makedirs(os.path.dirname(output_file), exist_ok=True)
-    filepath = save_to_csv(collected[:target_count], output_file)
-    return {"file": filepath, "data": collected}
+    fieldnames = LIST_FIELDS if mode == "list" else FIELDS
+    seen = SeenKeys("google_maps", query) if as_bool(delta) else None
+    error = None
+
+    with metrics.track_run("google_maps") as run, get_scheduler().session(DOMAIN), get_pool().page() as page:
+        network = NETWORK_POLICY.apply(page.context)
+        waiter = Waiter(page)
+        # Opened last, right before the try whose finally closes it, so a setup error leaves no orphaned .part.
+        writer = open_writer(output_file, fieldnames, output_format, column_types=COLUMN_TYPES, meta={
+            "plugin": "google_maps", "query": query, "limit": limit, "mode": mode, "delta": seen is not None,
+        })
+        try:
+            search_url = f"{BASE_URL}/maps/search/{quote_plus(query)}"
+            logger.info(f"Navigating to {search_url}")
+            progress.phase("navigating", source="google_maps")
+            get_scheduler().goto(page, search_url, timeout=timeout_ms)
+
+            progress.phase("collecting", source="google_maps", mode=mode)
+            if mode == "list":
+                collect_with_list(page, waiter, writer, target_count, max_scrolls, seen)
+            elif mode == "tabs":
+                collect_with_tabs(page, waiter, writer, target_count, max_scrolls, max(1, int(concurrency)), seen)
+            else:
+                collect_with_panel(page, waiter, writer, target_count, max_scrolls, seen)
+        except Exception as e:
+            error = str(e)
+            if isinstance(e, BlockedError):
+                run.status = "blocked"
+            logger.error(f"Unexpected error: {e}")
+        finally:
+            progress.phase("saving", source="google_maps")
+            if seen is not None:
+                seen.save()
+                writer.meta["delta_summary"] = seen.summary()
+                logger.info(f"Delta: {seen.summary()}")
+            writer.close(error, timings={"waits": waiter.summary()})
+        logger.info(f"Wait timings: {waiter.summary()}")
+        logger.info(f"Network: {network.summary()}")
+        run.status = run.status or writer.status
+
+    return {
+        "file": writer.filepath,
+        "count": writer.rows,
+        "status": writer.status,
+        "error": error,
+        "waits": waiter.summary(),
+        "network": network.summary(),
+        "delta": seen.summary() if seen is not None else None,
+        "metrics": run.breakdown(),
+    }
+
 
 
 
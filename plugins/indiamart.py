@@ -3,27 +3,86 @@
 # import subprocess
 # subprocess.run(["python", "-m", "playwright", "install", "chromium"], check=True)
 
-from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
-import csv
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+from bs4 import BeautifulSoup
 import os
-import time
 import re
-from urllib.parse import quote_plus
+import threading
+import requests
+from urllib.parse import quote_plus, urlparse
+from utils import metrics, progress
+from utils.browser_pool import get_pool
 from utils.logger import get_logger
+from utils.network_policy import NetworkPolicy, ANALYTICS_PATTERNS
+from utils.output import open_writer
+from utils.politeness import get_scheduler, BlockedError, BLOCK_STATUSES
+from utils.seen_keys import SeenKeys, UNCHANGED, as_bool
+from utils.waits import Waiter
 
 logger = get_logger("indiamart")
 description = "Scrape supplier contact data from IndiaMART (B2B marketplace)."
 
+SCROLL_WAIT_MS = 3000
+# Overridable so benchmarks can point the plugin at a local fixture server.
+BASE_URL = os.getenv("INDIAMART_BASE_URL", "https://dir.indiamart.com").rstrip("/")
+DOMAIN = urlparse(BASE_URL).hostname
+FIELDS = ["Company Name", "Location", "Phone", "URL"]
+
+# "auto" tries plain HTTP first and falls back to the browser; "http"/"browser" force one.
+MODES = ("auto", "http", "browser")
+DEFAULT_MODE = os.getenv("INDIAMART_MODE", "auto")
+HTTP_TIMEOUT = 15
+HTTP_MAX_PAGES = int(os.getenv("INDIAMART_MAX_PAGES", "10"))
+PAGE_PARAM = "pg"
+HTTP_HEADERS = {
+    "User-Agent": ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko)"
+                   " Chrome/126.0.0.0 Safari/537.36"),
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-IN,en;q=0.9",
+}
+CHALLENGE_MARKERS = ("captcha", "cf-chl", "challenge-platform", "access denied")
+
+_http_local = threading.local()
+
+# Product photos, fonts, video and ad scripts are never read by the scraper.
+NETWORK_POLICY = NetworkPolicy(
+    block_resource_types=["image", "media", "font"],
+    block_url_patterns=ANALYTICS_PATTERNS + [r"\.(png|jpe?g|gif|webp|svg|woff2?)(\?|$)", r"adservice"],
+)
+
+class NeedsBrowser(Exception):
+    """The HTTP fast path cannot read this query (no cards, a challenge page or a block)."""
+
+class PagingStopped(NeedsBrowser):
+    """HTTP paging ended short of the limit before a real last page; the browser carries on with its output.
+
+    resume is (writer, seen, seen_entries) of the still open output.
+    """
+
+    def __init__(self, message, resume):
+        super().__init__(message)
+        self.resume = resume
+
 def build_search_url(query):
-    return f"https://dir.indiamart.com/search.mp?ss={quote_plus(query)}"
+    return f"{BASE_URL}/search.mp?ss={quote_plus(query)}"
 
-def scroll_feed(page):
-    """Scroll results to load more cards."""
-    try:
-        page.evaluate("window.scrollBy(0, document.body.scrollHeight)")
-    except:
-        logger.warning("Could not scroll feed. Possibly no more results.")
-    time.sleep(2)
+def scroll_feed(page, waiter=None):
+    """Scroll results and wait until more cards load (or SCROLL_WAIT_MS passes).
+
+    Returns True if new cards appeared.
+    """
+    waiter = waiter or Waiter(page)
+    get_scheduler().wait(DOMAIN)
+    with metrics.phase("scroll"):
+        try:
+            cards_before = page.evaluate(
+                "() => { window.scrollBy(0, document.body.scrollHeight);"
+                " return document.querySelectorAll('.supplierInfoDiv').length; }"
+            )
+        except:
+            logger.warning("Could not scroll feed. Possibly no more results.")
+            return False
+        return waiter.count_grows(".supplierInfoDiv", cards_before, timeout_ms=SCROLL_WAIT_MS)
 
 def normalize_key(*values):
     """Normalize values for duplicate detection."""
@@ -31,8 +90,45 @@ def normalize_key(*values):
         return re.sub(r"\s+", " ", v.strip().lower())
     return tuple(clean(str(v)) for v in values)
 
+# Same fields as extract_card_data, read for every card after `cursor` in one
+# page.evaluate round trip. If the list shrank (page re-rendered), start over.
+CARDS_AFTER_JS = """
+(cursor) => {
+    const all = document.querySelectorAll('.supplierInfoDiv');
+    const start = cursor <= all.length ? cursor : 0;
+    const text = (card, sel) => {
+        const el = card.querySelector(sel);
+        return el ? el.innerText.trim() : 'N/A';
+    };
+    const cards = [];
+    for (let i = start; i < all.length; i++) {
+        const card = all[i];
+        const link = card.querySelector('.companyname a');
+        cards.push({
+            'Company Name': text(card, '.companyname a'),
+            'Location': text(card, '.newLocationUi span.highlight'),
+            'Phone': text(card, '.pns_h, .contactnumber .duet'),
+            'URL': link ? link.getAttribute('href') || 'N/A' : 'N/A',
+        });
+    }
+    return {total: all.length, cards: cards};
+}
+"""
+
+def supplier_key(data):
+    """Identity of a supplier across runs: its company URL, or name and location when it has none."""
+    if data.get("URL") not in (None, "", "N/A"):
+        return (data["URL"].split("?")[0],)
+    return (data["Company Name"], data["Location"])
+
+def extract_cards_after(page, cursor):
+    """Return (total_cards, [card dicts]) for the cards after cursor, in one round trip."""
+    with metrics.phase("extract_cards"):
+        batch = page.evaluate(CARDS_AFTER_JS, cursor)
+    return batch["total"], batch["cards"]
+
 def extract_card_data(card):
-    """Extract data from a supplier card."""
+    """Extract data from a supplier card (one IPC round trip per field; see extract_cards_after)."""
     try:
         company_name = card.query_selector(".companyname a")
         location = card.query_selector(".newLocationUi span.highlight")
@@ -51,89 +147,307 @@ def extract_card_data(card):
             "URL": url
         }
     except Exception as e:
+        metrics.count("card_failures")
         logger.warning(f"Error extracting a card: {e}")
         return None
 
-def save_to_csv(data, filepath):
-    os.makedirs(os.path.dirname(filepath), exist_ok=True)
-    with open(filepath, "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=["Company Name", "Location", "Phone", "URL"])
-        writer.writeheader()
-        writer.writerows(data)
-    logger.info(f"Scraping completed. Output saved to {filepath}")
-    return filepath
-
-def run_scraper(query, output_file=None, limit=None):
+def card_key(data):
+    return normalize_key(data["Company Name"], data["Location"], data["Phone"])
+
+def finish_output(writer, seen, error, timings=None):
+    """Save the delta state and close the writer."""
+    progress.phase("saving", source="indiamart")
+    if seen is not None:
+        seen.save()
+        writer.meta["delta_summary"] = seen.summary()
+        logger.info(f"Delta: {seen.summary()}")
+    writer.close(error, timings=timings)
+
+def write_cards(writer, cards, seen, seen_entries, target_count):
+    """Write cards that are not duplicates (and, with delta, new or changed); returns how many were written."""
+    new_count = 0
+    for data in cards:
+        if writer.rows >= target_count:
+            break
+        if seen and seen.observe(supplier_key(data), data) == UNCHANGED:
+            continue
+        entry_key = card_key(data)
+        if entry_key not in seen_entries:
+            writer.write(data)
+            seen_entries.add(entry_key)
+            new_count += 1
+    return new_count
+
+def http_session():
+    """This thread's requests.Session, so connections to IndiaMART are kept alive across pages and runs."""
+    session = getattr(_http_local, "session", None)
+    if session is None:
+        session = requests.Session()
+        session.headers.update(HTTP_HEADERS)
+        adapter = requests.adapters.HTTPAdapter(pool_connections=2, pool_maxsize=4)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        _http_local.session = session
+    return session
+
+def page_url(query, page_number):
+    url = build_search_url(query)
+    return url if page_number == 1 else f"{url}&{PAGE_PARAM}={page_number}"
+
+def parse_cards(html):
+    """Same fields as CARDS_AFTER_JS, read from server-rendered HTML."""
+    def text(card, selector):
+        el = card.select_one(selector)
+        return " ".join(el.get_text().split()) or "N/A" if el else "N/A"
+
+    cards = []
+    for card in BeautifulSoup(html, "html.parser").select(".supplierInfoDiv"):
+        link = card.select_one(".companyname a")
+        cards.append({
+            "Company Name": text(card, ".companyname a"),
+            "Location": text(card, ".newLocationUi span.highlight"),
+            "Phone": text(card, ".pns_h, .contactnumber .duet"),
+            "URL": link.get("href") or "N/A" if link else "N/A",
+        })
+    return cards
+
+def fetch_cards(query, page_number):
+    """GET one result page and parse its cards; raises NeedsBrowser for a block, or a challenge page without cards."""
+    url = page_url(query, page_number)
+    get_scheduler().wait(DOMAIN)
+    with metrics.phase("http_fetch"):
+        response = http_session().get(url, timeout=HTTP_TIMEOUT)
+    if response.status_code in BLOCK_STATUSES:
+        get_scheduler().report_block(DOMAIN, f"HTTP {response.status_code}")
+        raise NeedsBrowser(f"HTTP {response.status_code} for {url}")
+    response.raise_for_status()
+    with metrics.phase("parse"):
+        cards = parse_cards(response.text)
+    if not cards:
+        lowered = f"{response.url} {response.text}".lower()
+        marker = next((m for m in CHALLENGE_MARKERS if m in lowered), None)
+        if marker:
+            raise NeedsBrowser(f"challenge page ({marker}) for {url}")
+    get_scheduler().report_ok(DOMAIN)
+    return cards
+
+def scrape_http(run, query, output_file, limit, output_format, delta, hand_off=False):
+    """Page through server-rendered results over plain HTTP, without a browser.
+
+    Raises NeedsBrowser before any output is written if the first page has no
+    cards or is a challenge. Paging that ends short of the limit without reaching
+    a real last page (a short or empty page) raises PagingStopped with the output
+    still open when hand_off is set, and otherwise saves the output as partial.
+    """
     target_count = limit if limit is not None else 40
-    timeout_ms = 180000 if limit is None else 60000
-
-    with sync_playwright() as p:
+    with get_scheduler().session(DOMAIN):
+        progress.phase("navigating", source="indiamart", fetch="http")
+        logger.info(f"Fetching {page_url(query, 1)}")
         try:
-            browser = p.chromium.launch(headless=True, args=["--no-sandbox", "--disable-blink-features=AutomationControlled"])
-            page = browser.new_page()
-
-            search_url = build_search_url(query)
-            logger.info(f"Navigating to {search_url}")
-            page.goto(search_url, timeout=timeout_ms)
-
-            try:
-                page.wait_for_selector(".supplierInfoDiv", timeout=15000)
-            except PlaywrightTimeoutError:
-                logger.warning("⚠ No supplier cards found.")
-                browser.close()
-                return {"file": None, "data": []}
-
-            collected = []
-            seen_entries = set()
-            scrolls_done = 0
-            max_scrolls = 40 if limit is None else 20
-            last_cards_count = 0
-
-            while len(collected) < target_count and scrolls_done < max_scrolls:
-                cards = page.query_selector_all(".supplierInfoDiv")
-                logger.info(f"Found {len(cards)} cards on scroll #{scrolls_done + 1}")
-
-                new_cards = []
-                for c in cards:
-                    data = extract_card_data(c)
-                    if not data:
-                        continue
-                    entry_key = normalize_key(data["Company Name"], data["Location"], data["Phone"])
-                    if entry_key not in seen_entries:
-                        new_cards.append(data)
-                        seen_entries.add(entry_key)
-
-                logger.info(f"New unique cards this round: {len(new_cards)}")
-                collected.extend(new_cards)
-
-                if len(collected) >= target_count:
+            cards = fetch_cards(query, 1)
+        except requests.RequestException as e:
+            raise NeedsBrowser(f"HTTP request failed: {e}")
+        if not cards:
+            raise NeedsBrowser("no supplier cards in the HTML")
+
+        seen = SeenKeys("indiamart", query) if as_bool(delta) else None
+        writer = open_writer(output_file, FIELDS, output_format, meta={
+            "plugin": "indiamart", "query": query, "limit": limit, "delta": seen is not None, "fetch": "http",
+        })
+        progress.phase("collecting", source="indiamart", fetch="http")
+        seen_entries = set()
+        fetched = set()
+        error = None
+        exhausted = False
+        page_size = len(cards)
+        page_number = 1
+        try:
+            while True:
+                fetched.update(card_key(c) for c in cards)
+                progress.publish(progress.CARDS, source="indiamart", found=len(fetched), page=page_number)
+                new_count = write_cards(writer, cards, seen, seen_entries, target_count)
+                logger.info(f"Page {page_number}: {len(cards)} cards, {new_count} new")
+                if writer.rows >= target_count:
                     break
-
-                scroll_feed(page)
-                scrolls_done += 1
-
-                if len(cards) == last_cards_count:
-                    logger.info("ℹ No new cards loaded after scrolling, ending.")
+                if len(cards) < page_size:
+                    exhausted = True
                     break
-                last_cards_count = len(cards)
-
-            browser.close()
-
-            if not output_file:
-                safe_query = query.replace(" ", "_")
-                output_file = os.path.abspath(os.path.join("static", f"{safe_query}_indiamart.csv"))
-            else:
-                # Ensure absolute path always
-                output_file = os.path.abspath(output_file)
+                if page_number >= HTTP_MAX_PAGES:
+                    break
+                page_number += 1
+                cards = fetch_cards(query, page_number)
+                if not cards:
+                    exhausted = True
+                    break
+                if all(card_key(c) in fetched for c in cards):
+                    logger.info(f"ℹ Page {page_number} repeats earlier cards, ending HTTP paging.")
+                    break
+        except (requests.RequestException, NeedsBrowser) as e:
+            error = str(e)
+            logger.warning(f"Stopped paging at page {page_number}: {e}")
+        except Exception as e:
+            finish_output(writer, seen, str(e))
+            raise
+
+        if writer.rows < target_count and not exhausted:
+            reason = error or f"HTTP paging stopped at page {page_number} with {writer.rows} of {target_count} rows"
+            if hand_off:
+                raise PagingStopped(reason, (writer, seen, seen_entries))
+            error = reason
+        finish_output(writer, seen, error)
+
+    run.status = writer.status
+    return {
+        "file": writer.filepath,
+        "count": writer.rows,
+        "status": writer.status,
+        "error": error,
+        "fetch": "http",
+        "pages": page_number,
+        "delta": seen.summary() if seen is not None else None,
+        "metrics": run.breakdown(),
+    }
+
+def run_scraper(query, output_file=None, limit=None, output_format="csv", delta=False, mode=DEFAULT_MODE):
+    """Scrape IndiaMART suppliers for query.
+
+    mode="auto" reads the server-rendered result pages over plain HTTP and only
+    starts a browser when they have no cards or are a challenge page, or to keep
+    scrolling when paging stops short of the limit; "http" and "browser" force one
+    of the two.
+    delta=True writes only suppliers that are new or whose row changed since the
+    last delta run for this query; limit then counts those rows.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown mode {mode!r}, expected one of {', '.join(MODES)}")
 
-            os.makedirs(os.path.dirname(output_file), exist_ok=True)
-            filepath = save_to_csv(collected[:target_count], output_file)
+    if not output_file:
+        safe_query = query.replace(" ", "_")
+        output_file = os.path.abspath(os.path.join("static", f"{safe_query}_indiamart.csv"))
+    else:
+        # Ensure absolute path always
+        output_file = os.path.abspath(output_file)
 
-            return {"file": filepath, "data": collected[:target_count]}
+    with metrics.track_run("indiamart") as run:
+        resume = None
+        if mode != "browser":
+            try:
+                return scrape_http(run, query, output_file, limit, output_format, delta, hand_off=mode == "auto")
+            except NeedsBrowser as e:
+                metrics.count("browser_fallbacks")
+                if mode == "http":
+                    run.status = "failed"
+                    return {"file": None, "count": 0, "error": str(e), "metrics": run.breakdown()}
+                resume = getattr(e, "resume", None)
+                logger.info(f"HTTP fast path {'stopped early' if resume else 'unavailable'} ({e}), using the browser")
+        return scrape_browser(run, query, output_file, limit, output_format, delta, resume)
+
+def scrape_browser(run, query, output_file, limit, output_format, delta, resume=None):
+    """Load the results in Playwright and read the cards as infinite scroll adds them.
+
+    resume continues the output of a PagingStopped HTTP run: its rows are kept
+    and the cards it already wrote are skipped.
+    """
+    target_count = limit if limit is not None else 40
+    timeout_ms = 180000 if limit is None else 60000
+    writer, seen, seen_entries = resume or (None, None, set())
+    if writer is not None:
+        writer.meta["fetch"] = "http+browser"
 
-        except Exception as e:
-            logger.error(f"Unexpected error: {e}")
-            return {"file": None, "data": []}
+    try:
+        with get_scheduler().session(DOMAIN), get_pool().page() as page:
+            network = NETWORK_POLICY.apply(page.context)
+            waiter = Waiter(page)
+            error = None
+            try:
+                search_url = build_search_url(query)
+                logger.info(f"Navigating to {search_url}")
+                progress.phase("navigating", source="indiamart")
+                get_scheduler().goto(page, search_url, timeout=timeout_ms)
+
+                try:
+                    with metrics.phase("wait_selector"):
+                        page.wait_for_selector(".supplierInfoDiv", timeout=15000)
+                except PlaywrightTimeoutError:
+                    logger.warning("⚠ No supplier cards found.")
+                    if writer is None:
+                        run.status = "no_results"
+                        return {"file": None, "count": 0, "metrics": run.breakdown()}
+                    raise
+
+                if writer is None:
+                    seen = SeenKeys("indiamart", query) if as_bool(delta) else None
+                    writer = open_writer(output_file, FIELDS, output_format, meta={
+                        "plugin": "indiamart", "query": query, "limit": limit, "delta": seen is not None,
+                        "fetch": "browser",
+                    })
+                scrolls_done = 0
+                max_scrolls = 40 if limit is None else 20
+                cursor = 0
+                progress.phase("collecting", source="indiamart")
+
+                while writer.rows < target_count and scrolls_done < max_scrolls:
+                    total_cards, cards = extract_cards_after(page, cursor)
+                    cursor = total_cards
+                    logger.info(f"Found {total_cards} cards on scroll #{scrolls_done + 1}, {len(cards)} not seen before")
+                    progress.publish(progress.CARDS, source="indiamart", found=total_cards, scroll=scrolls_done + 1)
+
+                    new_count = write_cards(writer, cards, seen, seen_entries, target_count)
+                    logger.info(f"New unique cards this round: {new_count}")
+
+                    if writer.rows >= target_count:
+                        break
+
+                    grew = scroll_feed(page, waiter)
+                    scrolls_done += 1
+
+                    if not grew:
+                        logger.info("ℹ No new cards loaded after scrolling, ending.")
+                        break
+
+            except Exception as e:
+                error = str(e)
+                run.status = "blocked" if isinstance(e, BlockedError) else None
+                logger.error(f"Unexpected error: {e}")
+                if writer is None:
+                    run.status = run.status or "failed"
+                    return {"file": None, "count": 0, "error": error, "metrics": run.breakdown()}
+            finally:
+                if writer is not None:
+                    finish_output(writer, seen, error, timings={"waits": waiter.summary()})
+
+            logger.info(f"Wait timings: {waiter.summary()}")
+            logger.info(f"Network: {network.summary()}")
+            run.status = run.status or writer.status
+
+            return {
+                "file": writer.filepath,
+                "count": writer.rows,
+                "status": writer.status,
+                "error": error,
+                "waits": waiter.summary(),
+                "network": network.summary(),
+                "fetch": writer.meta["fetch"],
+                "delta": seen.summary() if seen is not None else None,
+                "metrics": run.breakdown(),
+            }
+    except Exception as e:
+        # The browser never took over (launch, session lease or route setup failed): keep the HTTP rows.
+        if writer is None or writer.status is not None:
+            raise
+        error = str(e) or type(e).__name__
+        logger.error(f"Browser hand-off failed: {error}")
+        finish_output(writer, seen, error)
+        run.status = "blocked" if isinstance(e, BlockedError) else writer.status
+        return {
+            "file": writer.filepath,
+            "count": writer.rows,
+            "status": writer.status,
+            "error": error,
+            "fetch": writer.meta["fetch"],
+            "delta": seen.summary() if seen is not None else None,
+            "metrics": run.breakdown(),
+        }
 
 
 
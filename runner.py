@@ -1,76 +1,341 @@
 # runner.py
 
-import importlib
+import time
+
+STARTED_AT = time.perf_counter()
+
+import hashlib
 import os
+import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
 import traceback
 import subprocess
 import sys
 import json
+from utils.helpers import plugin_options
+from utils.plugin_registry import get_registry
+from utils.output import OUTPUT_FORMATS, with_format_extension
+from utils.result_cache import normalize_query
+from utils.browser_pool import get_pool
+from utils.politeness import get_scheduler
+from utils.replay import record_to, replay_from
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+READY_MARKER = os.getenv("PLAYWRIGHT_READY_MARKER", os.path.join(BASE_DIR, "logs", ".browsers_ready.json"))
+# Plugin mode that routes every request through Playwright (see --record/--replay).
+BROWSER_MODE = "browser"
 
-def generate_filename(query, site):
+def generate_filename(query, site, output_format="csv"):
     filename_safe = query.lower().replace(" ", "_")
     date_str = datetime.now().strftime("%d%m%y_%H%M%S")
-    return os.path.join(BASE_DIR, "static", f"{filename_safe}_{site}_{date_str}.csv")
+    return os.path.join(BASE_DIR, "static", f"{filename_safe}_{site}_{date_str}.{output_format}")
+
+def chromium_executable_path():
+    """Ask Playwright where its Chromium build lives (starts the driver, so not free)."""
+    from playwright.sync_api import sync_playwright
+    with sync_playwright() as p:
+        return p.chromium.executable_path
 
-def run_scraper(site, query, output_file, limit=None):
-    # Ensure Playwright Chromium is installed
+def write_ready_marker(executable_path):
+    os.makedirs(os.path.dirname(READY_MARKER), exist_ok=True)
+    with open(READY_MARKER, "w", encoding="utf-8") as f:
+        json.dump({"executable_path": executable_path, "checked_at": time.time()}, f)
+
+def browsers_ready():
+    """Return True if Chromium is installed.
+
+    The executable path is cached in READY_MARKER, so after the first check this
+    is a single os.path.exists call instead of a Playwright driver start.
+    """
+    try:
+        with open(READY_MARKER, encoding="utf-8") as f:
+            cached = json.load(f).get("executable_path")
+        if cached and os.path.exists(cached):
+            return True
+    except (OSError, ValueError):
+        pass
+
+    try:
+        executable_path = chromium_executable_path()
+    except Exception:
+        return False
+    if not os.path.exists(executable_path):
+        return False
+    write_ready_marker(executable_path)
+    return True
+
+def install_browsers():
+    """Install Playwright Chromium once and record its location."""
     try:
-        subprocess.run(
-            ["python", "-m", "playwright", "install", "chromium"],
-            check=True,
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL
-        )
-    except subprocess.CalledProcessError as e:
+        subprocess.run([sys.executable, "-m", "playwright", "install", "chromium"], check=True)
+        write_ready_marker(chromium_executable_path())
+    except Exception as e:
         print(json.dumps({"success": False, "error": f"Failed to install Playwright browsers: {e}"}))
         sys.exit(1)
+    print(json.dumps({"success": True, "marker": READY_MARKER}))
+    sys.exit(0)
+
+def parse_options(pairs):
+    """Turn ["mode=tabs", "concurrency=6"] into {"mode": "tabs", "concurrency": 6}."""
+    options = {}
+    for pair in pairs or []:
+        key, _, value = pair.partition("=")
+        options[key.strip()] = int(value) if value.strip().isdigit() else value.strip()
+    return options
+
+def run_scraper(site, query, output_file, limit=None, options=None):
+    """Run one plugin and return the result dict that the CLI prints as JSON.
+
+    Never exits, so batch mode can call it in a loop. Results without "timings"
+    mean the scrape could not start or crashed.
+    """
+    if not browsers_ready():
+        return {
+            "success": False,
+            "error": "Playwright Chromium is not installed. Run: python runner.py --install-browsers"
+        }
 
     try:
-        scraper_module = importlib.import_module(f"plugins.{site}")
+        scraper_module = get_registry().load(site)
     except ModuleNotFoundError:
-        print(json.dumps({"success": False, "error": f"Scraper module not found for site: {site}"}))
-        sys.exit(1)
+        return {"success": False, "error": f"Scraper module not found for site: {site}"}
+
+    startup_seconds = round(time.perf_counter() - STARTED_AT, 3)
 
     try:
         # Run scraper
+        scrape_started = time.perf_counter()
+        kwargs = plugin_options(scraper_module.run_scraper, options)
         if "base_dir" in scraper_module.run_scraper.__code__.co_varnames:
-            count = scraper_module.run_scraper(query, output_file, limit=limit, base_dir=BASE_DIR)
+            result = scraper_module.run_scraper(query, output_file, limit=limit, base_dir=BASE_DIR, **kwargs)
         else:
-            count = scraper_module.run_scraper(query, output_file, limit=limit)
+            result = scraper_module.run_scraper(query, output_file, limit=limit, **kwargs)
+        delta = None
+        run_metrics = None
+        if isinstance(result, dict):
+            count = result.get("count", len(result.get("data") or []))
+            delta = result.get("delta")
+            run_metrics = result.get("metrics")
+            output_file = result.get("file") or output_file
+        else:
+            count = result
+        timings = {
+            "startup_seconds": startup_seconds,
+            "scrape_seconds": round(time.perf_counter() - scrape_started, 3),
+            "total_seconds": round(time.perf_counter() - STARTED_AT, 3),
+        }
 
-        if count == 0:
-            print(json.dumps({"success": False, "error": "No data scraped."}))
-            sys.exit(0)
+        if count == 0 and delta is None:
+            return {"success": False, "error": "No data scraped.", "timings": timings, "metrics": run_metrics}
 
         if not os.path.exists(output_file):
-            print(json.dumps({"success": False, "error": "Output file not found."}))
-            sys.exit(0)
+            return {"success": False, "error": "Output file not found.", "timings": timings}
 
-        print(json.dumps({"success": True, "file": output_file, "count": count}))
-        sys.exit(0)
+        return {"success": True, "file": output_file, "count": count, "delta": delta, "timings": timings,
+                "metrics": run_metrics}
 
     except Exception as e:
-        print(json.dumps({"success": False, "error": str(e)}))
         traceback.print_exc()
-        sys.exit(1)
+        return {"success": False, "error": str(e)}
+
+def read_batch(path):
+    """Queries from a batch file: one per line, blank lines and # comments skipped, duplicates dropped."""
+    queries = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            query = line.strip()
+            if query and not query.startswith("#"):
+                queries.setdefault(normalize_query(query), query)
+    return list(queries.values())
+
+def batch_filename(output_dir, query, site, output_format="csv"):
+    """Stable per-query output path, so a resumed batch finds the same files."""
+    safe = re.sub(r"\W+", "_", query.lower()).strip("_")[:80] or "query"
+    digest = hashlib.sha1(normalize_query(query).encode("utf-8")).hexdigest()[:8]
+    return os.path.join(output_dir, f"{safe}_{digest}_{site}.{output_format}")
+
+def read_manifest(path):
+    """Latest manifest entry per normalized query (later lines win)."""
+    entries = {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # a line cut short by an interrupted run
+                entries[normalize_query(entry.get("query"))] = entry
+    except OSError:
+        pass
+    return entries
+
+def batch_worker(site, query, output_file, limit, options):
+    """Process-pool task: scrape one query and return its manifest entry."""
+    started = time.perf_counter()
+    result = run_scraper(site, query, output_file, limit, options)
+    return {
+        "query": query,
+        "site": site,
+        "success": result.get("success", False),
+        "file": result.get("file"),
+        "count": result.get("count", 0),
+        "error": result.get("error"),
+        "seconds": round(time.perf_counter() - started, 3),
+        "finished_at": time.time(),
+    }
+
+def run_batch(site, batch_file, workers, output_dir, limit=None, options=None, output_format="csv"):
+    """Scrape every query in batch_file on a pool of worker processes.
+
+    Each finished query is appended to manifest.jsonl in output_dir; running the same
+    batch again skips queries the manifest records as successful. Each worker process
+    keeps its browser warm across the queries it runs. Returns the aggregate summary.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, "manifest.jsonl")
+    done = read_manifest(manifest_path)
+    queries = read_batch(batch_file)
+    todo = [q for q in queries if not done.get(normalize_query(q), {}).get("success")]
+    print(f"Batch: {len(queries)} queries, {len(queries) - len(todo)} already done, "
+          f"{len(todo)} to run on {workers} workers", file=sys.stderr)
+
+    started = time.perf_counter()
+    succeeded = failed = rows = 0
+    interrupted = False
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        futures = [
+            executor.submit(batch_worker, site, q, batch_filename(output_dir, q, site, output_format), limit, options)
+            for q in todo
+        ]
+        with open(manifest_path, "a", encoding="utf-8") as manifest:
+            for future in as_completed(futures):
+                try:
+                    entry = future.result()
+                except Exception as e:
+                    # The worker process died; its query is retried on the next run.
+                    print(f"Batch worker failed: {e}", file=sys.stderr)
+                    failed += 1
+                    continue
+                manifest.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                manifest.flush()
+                if entry["success"]:
+                    succeeded += 1
+                    rows += entry["count"] or 0
+                else:
+                    failed += 1
+                print(f"[{succeeded + failed}/{len(todo)}] {entry['query']!r}: "
+                      f"{entry['count'] if entry['success'] else entry['error']}", file=sys.stderr)
+    except KeyboardInterrupt:
+        interrupted = True
+        print("Interrupted; run the same command again to resume from the manifest.", file=sys.stderr)
+    finally:
+        executor.shutdown(wait=not interrupted, cancel_futures=True)
+
+    seconds = time.perf_counter() - started
+    return {
+        "success": failed == 0 and not interrupted,
+        "batch": os.path.abspath(batch_file),
+        "manifest": os.path.abspath(manifest_path),
+        "queries": len(queries),
+        "skipped": len(queries) - len(todo),
+        "succeeded": succeeded,
+        "failed": failed,
+        "interrupted": interrupted,
+        "rows": rows,
+        "seconds": round(seconds, 3),
+        "queries_per_min": round((succeeded + failed) / seconds * 60, 2) if seconds else 0,
+        "rows_per_sec": round(rows / seconds, 2) if seconds else 0,
+    }
 
 def main():
     import argparse
     parser = argparse.ArgumentParser(description="Modular Web Scraper")
     parser.add_argument("--mode", default="modular")
-    parser.add_argument("--site", required=True)
-    parser.add_argument("--query", required=True)
+    parser.add_argument("--site")
+    parser.add_argument("--query")
     parser.add_argument("--output", required=False)
     parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--format", dest="output_format", choices=OUTPUT_FORMATS, default="csv",
+                        help="Output format (default: csv)")
+    parser.add_argument("--opt", action="append", default=[], metavar="KEY=VALUE",
+                        help="Plugin-specific option, e.g. --opt mode=panel --opt concurrency=6")
+    parser.add_argument("--batch", metavar="QUERIES_TXT",
+                        help="Scrape every query in this file (one per line) instead of --query")
+    parser.add_argument("--workers", type=int, default=2,
+                        help="Worker processes for --batch (default: 2)")
+    parser.add_argument("--output-dir",
+                        help="Directory for --batch outputs and manifest (default: static/batch_<file name>)")
+    har = parser.add_mutually_exclusive_group()
+    har.add_argument("--record", nargs="?", const="", metavar="HAR",
+                     help="Record the run's network traffic to a HAR (default: <output>.har.zip)")
+    har.add_argument("--replay", metavar="HAR",
+                     help="Serve every request from a recorded HAR; nothing goes to the network")
+    parser.add_argument("--latency-ms", type=int, default=0,
+                        help="With --replay, delay each replayed request by this many milliseconds")
+    parser.add_argument("--install-browsers", action="store_true",
+                        help="Install Playwright Chromium and cache its location, then exit")
     args = parser.parse_args()
 
-    output_file = args.output or generate_filename(args.query, args.site)
+    if args.install_browsers:
+        install_browsers()
+    if not args.site or not (args.query or args.batch):
+        parser.error("--site and --query (or --batch) are required")
+
+    if (args.record is not None or args.replay) and args.batch:
+        parser.error("--record and --replay work with a single --query, not --batch")
+    if args.latency_ms and not args.replay:
+        parser.error("--latency-ms only applies to --replay")
+
+    options = parse_options(args.opt)
+    if args.output_format != "csv":
+        options["output_format"] = args.output_format
+
+    if args.batch:
+        if not browsers_ready():
+            print(json.dumps({
+                "success": False,
+                "error": "Playwright Chromium is not installed. Run: python runner.py --install-browsers"
+            }))
+            sys.exit(1)
+        batch_name = os.path.splitext(os.path.basename(args.batch))[0]
+        output_dir = args.output_dir or os.path.join(BASE_DIR, "static", f"batch_{batch_name}")
+        summary = run_batch(args.site, args.batch, max(1, args.workers), output_dir, args.limit, options,
+                            args.output_format)
+        print(json.dumps(summary))
+        sys.exit(0 if summary["success"] else 1)
+
+    if args.replay or args.record is not None:
+        # HAR recording and replay only see browser traffic, so plugins with an HTTP path must use the browser.
+        mode_choices = (get_registry().metadata(args.site) or {}).get("choices", {}).get("mode", ())
+        if BROWSER_MODE in mode_choices:
+            if options.get("mode", BROWSER_MODE) != BROWSER_MODE:
+                parser.error(f"--record/--replay need the browser; {args.site} mode={options['mode']} bypasses it")
+            options["mode"] = BROWSER_MODE
+
+    output_file = args.output or generate_filename(args.query, args.site, args.output_format)
+    if args.output_format != "csv":
+        output_file = with_format_extension(output_file, args.output_format)
     output_file = os.path.abspath(output_file)
 
-    run_scraper(args.site, args.query, output_file, args.limit)
+    if args.replay:
+        if not os.path.exists(args.replay):
+            parser.error(f"HAR not found: {args.replay}")
+        replay_from(get_pool(), os.path.abspath(args.replay), args.latency_ms)
+        get_scheduler().enabled = False  # nothing reaches the site, so nothing to pace
+    elif args.record is not None:
+        har_path = os.path.abspath(args.record or f"{os.path.splitext(output_file)[0]}.har.zip")
+        record_to(get_pool(), har_path)
+
+    result = run_scraper(args.site, args.query, output_file, args.limit, options)
+    if args.replay:
+        result["replayed_from"] = os.path.abspath(args.replay)
+    elif args.record is not None:
+        result["recorded_to"] = har_path
+    print(json.dumps(result))
+    # A scrape that ran but found nothing still exits 0; setup failures and crashes exit 1.
+    sys.exit(0 if result["success"] or "timings" in result else 1)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,101 @@
+# test_app_smoke.py
+
+"""Submit scrape jobs through the Flask routes with the scrape bodies stubbed out."""
+
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+os.environ.setdefault("BROWSER_POOL_SIZE", "0")
+os.environ.setdefault("RESULTS_DB_ENABLED", "0")
+os.environ.setdefault("POLITENESS_ENABLED", "0")
+os.environ.setdefault("FLASK_SECRET_KEY", "test")
+
+flask = pytest.importorskip("flask")
+import app as app_module  # noqa: E402
+
+
+def stub_scrape(site, query, output_abs_path, limit, options=None):
+    return {"success": True, "file": output_abs_path, "count": 0}
+
+
+def stub_fanout(sites, query, output_abs_path, limit, options=None, site_timeout=None, use_cache=True):
+    return {"success": True, "file": output_abs_path, "count": 0, "sites": {s: {"success": True} for s in sites}}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(app_module, "run_scrape", stub_scrape)
+    monkeypatch.setattr(app_module, "run_fanout", stub_fanout)
+    return app_module.app.test_client()
+
+
+def wait_for(job_id, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = app_module.job_manager.get(job_id)
+        if job["status"] in ("done", "failed"):
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def test_api_scrape_single_site(client):
+    site = app_module.get_available_plugins()[0]
+    response = client.post("/api/scrape", json={"site": site, "query": "smoke test", "limit": 5, "cache": False})
+    assert response.status_code == 202
+    job = wait_for(response.get_json()["job_id"])
+    assert job["status"] == "done", job["error"]
+    assert (job["site"], job["query"], job["limit"]) == (site, "smoke test", 5)
+
+
+def test_index_form_submits_job(client):
+    site = app_module.get_available_plugins()[0]
+    response = client.post("/", data={"site": site, "query": "smoke form", "limit": "3"})
+    assert response.status_code == 302
+    with client.session_transaction() as session:
+        job_id = session["job_id"]
+    assert wait_for(job_id)["status"] == "done"
+
+
+def test_api_scrape_fanout(client):
+    response = client.post("/api/scrape", json={"site": "all", "query": "smoke test", "limit": 5})
+    assert response.status_code == 202
+    job = wait_for(response.get_json()["job_id"])
+    assert job["status"] == "done", job["error"]
+    assert set(job["sites"]) == set(app_module.get_available_plugins())
+
+
+def test_index_form_fanout(client):
+    response = client.post("/", data={"site": "all", "query": "smoke form", "limit": "3"})
+    assert response.status_code == 302
+    with client.session_transaction() as session:
+        job_id = session["job_id"]
+    assert wait_for(job_id)["status"] == "done"
+
+
+def test_subprocess_fallback_skips_caching_partial_output(monkeypatch, tmp_path):
+    output = tmp_path / "out.csv"
+    output.write_text("Name\nA\n", encoding="utf-8")
+    (tmp_path / "out.csv.meta.json").write_text('{"status": "partial"}', encoding="utf-8")
+    cached = []
+    monkeypatch.setattr(app_module, "try_run_plugin_direct", lambda *args: {"success": False})
+    monkeypatch.setattr(app_module.subprocess, "run",
+                        lambda *args, **kwargs: type("Done", (), {"stdout": '{"success": true}'})())
+    monkeypatch.setattr(app_module.result_cache, "put", lambda *args: cached.append(args))
+    result = app_module.run_scrape("indiamart", "smoke", str(output), 5)
+    assert result["output_status"] == "partial"
+    assert cached == []
+
+
+def test_api_scrape_limit_is_coerced(client):
+    site = app_module.get_available_plugins()[0]
+    response = client.post("/api/scrape", json={"site": site, "query": "smoke limit", "limit": "7"})
+    assert response.status_code == 202
+    assert wait_for(response.get_json()["job_id"])["limit"] == 7
+    response = client.post("/api/scrape", json={"site": site, "query": "smoke limit", "limit": "fifty"})
+    assert response.status_code == 400
@@ -0,0 +1,69 @@
+# test_csv_index.py
+
+"""Byte-offset row index: quoted newlines, staleness and paging."""
+
+import csv
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils import csv_index  # noqa: E402
+
+ROWS = [
+    ["Name", "Address"],
+    ["Plain", "1 Main St"],
+    ["Multi", "line one\nline two"],
+    ["Quoted", 'says ""hi"", then\nleaves'],
+    ["Last", "end"],
+]
+
+
+def write_csv(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerows(rows)
+
+
+def test_index_skips_newlines_inside_quotes(tmp_path):
+    path = tmp_path / "rows.csv"
+    write_csv(path, ROWS)
+    offsets = csv_index.build_row_index(path)
+    assert len(offsets) == len(ROWS) + 1
+    assert offsets[-1] == os.path.getsize(path)
+
+
+def test_index_across_chunk_boundaries(tmp_path, monkeypatch):
+    path = tmp_path / "rows.csv"
+    write_csv(path, ROWS)
+    expected = list(csv_index.build_row_index(path))
+    monkeypatch.setattr(csv_index, "CHUNK_SIZE", 7)
+    assert list(csv_index.build_row_index(path)) == expected
+
+
+def test_read_page_returns_whole_records(tmp_path):
+    path = tmp_path / "rows.csv"
+    write_csv(path, ROWS)
+    headers, rows, total = csv_index.read_page(str(path), offset=1, limit=2)
+    assert headers == ROWS[0]
+    assert rows == ROWS[2:4]
+    assert total == len(ROWS) - 1
+    assert list(csv_index.iter_rows(str(path), offset=3)) == ROWS[4:]
+
+
+def test_read_page_past_the_end(tmp_path):
+    path = tmp_path / "rows.csv"
+    write_csv(path, ROWS)
+    assert csv_index.read_page(str(path), offset=10, limit=5) == (ROWS[0], [], len(ROWS) - 1)
+
+
+def test_index_is_rebuilt_when_the_file_changes(tmp_path):
+    path = tmp_path / "rows.csv"
+    write_csv(path, ROWS[:2])
+    assert csv_index.read_page(str(path))[2] == 1
+
+    write_csv(path, ROWS)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    headers, rows, total = csv_index.read_page(str(path))
+    assert total == len(ROWS) - 1
+    assert rows == ROWS[1:]
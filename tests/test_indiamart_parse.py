@@ -0,0 +1,24 @@
+# test_indiamart_parse.py
+
+"""IndiaMART HTTP path: supplier cards parsed from a saved result page."""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+pytest.importorskip("bs4")
+pytest.importorskip("playwright")
+from plugins import indiamart  # noqa: E402
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "..", "debug_indiamart_best_healthcare.html")
+
+
+def test_parse_cards_from_saved_page():
+    with open(FIXTURE, encoding="utf-8") as f:
+        cards = indiamart.parse_cards(f.read())
+    assert len(cards) == 10
+    assert all(card["Company Name"] for card in cards)
+    assert set(cards[0]) == set(indiamart.FIELDS)
@@ -0,0 +1,84 @@
+# test_result_cache.py
+
+"""Which requests the result cache answers, and how it trims larger entries."""
+
+import csv
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.output import read_meta  # noqa: E402
+from utils.result_cache import ResultCache  # noqa: E402
+
+
+def write_output(path, count):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Name", "Note"])
+        for i in range(count):
+            writer.writerow([f"Place {i}", "two\nlines" if i % 2 else "one"])
+    return str(path)
+
+
+def read_rows(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.reader(f))[1:]
+
+
+def test_serves_same_limit_and_smaller_limits(tmp_path):
+    cache = ResultCache()
+    cache.put("maps", "Cafes  Pune", 20, None, write_output(tmp_path / "full.csv", 20), 20)
+    assert cache.get("maps", "cafes pune", 20) is not None
+    assert cache.get("maps", "cafes pune", 5) is not None
+
+
+def test_misses_larger_limit_unless_exhausted(tmp_path):
+    cache = ResultCache()
+    cache.put("maps", "cafes", 20, None, write_output(tmp_path / "full.csv", 20), 20)
+    assert cache.get("maps", "cafes", 50) is None
+    assert cache.get("maps", "cafes", None) is None
+
+    cache.put("maps", "rare", 20, None, write_output(tmp_path / "rare.csv", 3), 3)
+    assert cache.get("maps", "rare", 50)["count"] == 3
+
+
+def test_answer_trims_a_larger_entry(tmp_path):
+    cache = ResultCache()
+    source = write_output(tmp_path / "full.csv", 10)
+    cache.put("maps", "cafes", 10, None, source, 10)
+    result = cache.answer("maps", "cafes", 3, None, str(tmp_path / "out" / "trimmed.csv"))
+    assert result["count"] == 3
+    assert result["file"].endswith("trimmed.csv")
+    assert read_rows(result["file"]) == read_rows(source)[:3]
+    assert read_meta(result["file"])["trimmed_from"] == "full.csv"
+
+
+def test_only_csv_entries_are_trimmed(tmp_path):
+    cache = ResultCache()
+    path = tmp_path / "full.jsonl"
+    path.write_text("{}\n" * 10, encoding="utf-8")
+    cache.put("maps", "cafes", 10, {"output_format": "jsonl"}, str(path), 10)
+    assert cache.get("maps", "cafes", 3, {"output_format": "jsonl"}) is None
+    assert cache.get("maps", "cafes", 10, {"output_format": "jsonl"}) is not None
+
+
+def test_put_keeps_the_bigger_entry(tmp_path):
+    cache = ResultCache()
+    big = write_output(tmp_path / "big.csv", 20)
+    cache.put("maps", "cafes", 20, None, big, 20)
+    cache.put("maps", "cafes", 5, None, write_output(tmp_path / "small.csv", 5), 5)
+    assert cache.get("maps", "cafes", 5)["file"] == big
+
+
+def test_expired_and_missing_entries_miss(tmp_path):
+    cache = ResultCache(ttl=-1)
+    cache.put("maps", "cafes", 5, None, write_output(tmp_path / "a.csv", 5), 5)
+    assert cache.get("maps", "cafes", 5) is None
+
+    cache = ResultCache()
+    path = write_output(tmp_path / "b.csv", 5)
+    cache.put("maps", "cafes", 5, None, path, 5)
+    os.remove(path)
+    assert cache.get("maps", "cafes", 5) is None
+    assert cache.stats()["misses"] == 1
@@ -0,0 +1,239 @@
+# browser_pool.py
+
+import atexit
+import os
+import threading
+import time
+from contextlib import contextmanager
+from utils import metrics
+from utils.logger import get_logger
+
+logger = get_logger("browser_pool")
+
+LAUNCH_ARGS = ["--no-sandbox", "--disable-blink-features=AutomationControlled"]
+MAX_JOBS_PER_BROWSER = int(os.getenv("BROWSER_MAX_JOBS", "50"))
+MAX_RSS_MB = int(os.getenv("BROWSER_MAX_RSS_MB", "1500"))
+
+
+def _process_table():
+    """{pid: (parent pid, name, RSS in kB)} of every process, read from /proc. Empty where /proc is missing."""
+    table = {}
+    if not os.path.isdir("/proc"):
+        return table
+    for pid in os.listdir("/proc"):
+        if not pid.isdigit():
+            continue
+        parent, name, rss_kb = None, "", 0
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                for line in f:
+                    if line.startswith("Name:"):
+                        name = line.split()[1]
+                    elif line.startswith("PPid:"):
+                        parent = int(line.split()[1])
+                    elif line.startswith("VmRSS:"):
+                        rss_kb = int(line.split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        table[int(pid)] = (parent, name, rss_kb)
+    return table
+
+
+def child_pids(pid):
+    return {child for child, (parent, _, _) in _process_table().items() if parent == pid}
+
+
+def chromium_rss_mb(root_pid=None):
+    """Resident memory (MB) of the Chromium processes under root_pid (default: this process). Linux only, 0 elsewhere."""
+    root_pid = root_pid or os.getpid()
+    table = _process_table()
+
+    def descends_from_root(pid):
+        seen = set()
+        while pid in table and pid not in seen:
+            seen.add(pid)
+            pid = table[pid][0]
+            if pid == root_pid:
+                return True
+        return False
+
+    total_kb = sum(
+        rss_kb for pid, (_, name, rss_kb) in table.items()
+        if "chrom" in name and descends_from_root(pid)
+    )
+    return total_kb // 1024
+
+
+class BrowserPool:
+    """Keep one warm Chromium per worker thread and hand out a fresh BrowserContext per job.
+
+    Playwright's sync API objects must stay on the thread that created them, so each
+    thread owns its own browser. A browser is recycled after max_jobs jobs or once its
+    own Chromium processes grow past max_rss_mb. Every slot starts its own Playwright
+    driver process, and the browser's processes are the Chromium ones under it.
+
+    context_options are applied to every new context (a plugin's own options win),
+    and each of context_hooks is called with every new context before it is handed
+    out; runner.py uses these for --record/--replay.
+    """
+
+    def __init__(self, max_jobs=MAX_JOBS_PER_BROWSER, max_rss_mb=MAX_RSS_MB, launch_args=None):
+        self.max_jobs = max_jobs
+        self.max_rss_mb = max_rss_mb
+        self.launch_args = launch_args or LAUNCH_ARGS
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        # Driver starts are serialized so each slot can tell its driver process apart from other threads'.
+        self.start_lock = threading.Lock()
+        self.slots = {}
+        self.launches = 0
+        self.recycles = 0
+        self.jobs_served = 0
+        self.context_options = {}
+        self.context_hooks = []
+
+    def _slot(self):
+        slot = getattr(self.local, "slot", None)
+        if slot is None or not slot["browser"].is_connected():
+            if slot is not None:
+                self._close_slot(slot)
+            slot = self._launch()
+        return slot
+
+    def _launch(self):
+        from playwright.sync_api import sync_playwright
+
+        started = time.time()
+        with self.start_lock:
+            before = child_pids(os.getpid())
+            playwright = sync_playwright().start()
+            drivers = child_pids(os.getpid()) - before
+        browser = playwright.chromium.launch(headless=True, args=self.launch_args)
+        slot = {
+            "playwright": playwright,
+            "browser": browser,
+            "driver_pid": drivers.pop() if len(drivers) == 1 else None,
+            "jobs": 0,
+            "launched_at": time.time(),
+            "launch_seconds": round(time.time() - started, 3),
+            "thread": threading.current_thread().name,
+        }
+        metrics.observe("browser_launch", time.time() - started)
+        self.local.slot = slot
+        with self.lock:
+            self.slots[threading.get_ident()] = slot
+            self.launches += 1
+        logger.info(f"Launched Chromium for {slot['thread']} in {slot['launch_seconds']}s")
+        return slot
+
+    def _close_slot(self, slot):
+        try:
+            slot["browser"].close()
+        except Exception:
+            pass
+        try:
+            slot["playwright"].stop()
+        except Exception:
+            pass
+        with self.lock:
+            self.slots.pop(threading.get_ident(), None)
+        self.local.slot = None
+
+    def _maybe_recycle(self, slot):
+        reason = None
+        if slot["jobs"] >= self.max_jobs:
+            reason = f"served {slot['jobs']} jobs"
+        elif self.max_rss_mb and slot["driver_pid"]:
+            rss = chromium_rss_mb(slot["driver_pid"])
+            if rss > self.max_rss_mb:
+                reason = f"Chromium RSS {rss}MB over {self.max_rss_mb}MB"
+        if reason:
+            logger.info(f"Recycling browser for {slot['thread']}: {reason}")
+            self._close_slot(slot)
+            with self.lock:
+                self.recycles += 1
+
+    @contextmanager
+    def context(self, **context_options):
+        """Yield a fresh BrowserContext on this thread's warm browser."""
+        slot = self._slot()
+        context = slot["browser"].new_context(**dict(self.context_options, **context_options))
+        try:
+            for hook in self.context_hooks:
+                hook(context)
+            yield context
+        finally:
+            try:
+                context.close()
+            except Exception:
+                pass
+            slot["jobs"] += 1
+            with self.lock:
+                self.jobs_served += 1
+            self._maybe_recycle(slot)
+
+    @contextmanager
+    def page(self, **context_options):
+        """Yield a new page inside a fresh BrowserContext."""
+        with self.context(**context_options) as context:
+            yield context.new_page()
+
+    def warm(self, executor, size):
+        """Launch a browser on `size` distinct threads of executor ahead of the first job."""
+        barrier = threading.Barrier(size)
+
+        def warm_one():
+            try:
+                barrier.wait(timeout=30)
+            except threading.BrokenBarrierError:
+                pass
+            try:
+                self._slot()
+            except Exception as e:
+                logger.warning(f"Could not pre-warm browser: {e}")
+
+        for _ in range(size):
+            executor.submit(warm_one)
+
+    def close(self):
+        """Close the browser owned by the calling thread, if any."""
+        slot = getattr(self.local, "slot", None)
+        if slot is not None:
+            self._close_slot(slot)
+
+    def stats(self):
+        with self.lock:
+            browsers = [
+                {
+                    "thread": s["thread"],
+                    "jobs": s["jobs"],
+                    "launch_seconds": s["launch_seconds"],
+                    "age_seconds": round(time.time() - s["launched_at"], 1),
+                    "rss_mb": chromium_rss_mb(s["driver_pid"]) if s["driver_pid"] else None,
+                }
+                for s in self.slots.values()
+            ]
+            return {
+                "browsers": browsers,
+                "size": len(browsers),
+                "launches": self.launches,
+                "recycles": self.recycles,
+                "jobs_served": self.jobs_served,
+                "max_jobs_per_browser": self.max_jobs,
+                "max_rss_mb": self.max_rss_mb,
+                "chromium_rss_mb": chromium_rss_mb(),
+            }
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Process-wide pool shared by every plugin."""
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = BrowserPool()
+            atexit.register(_default_pool.close)
+        return _default_pool
@@ -0,0 +1,108 @@
+# csv_index.py
+
+import csv
+import io
+import os
+import threading
+from array import array
+from collections import OrderedDict
+
+MAX_CACHED_INDEXES = 32
+CHUNK_SIZE = 1 << 20
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def build_row_index(file_path):
+    """Byte offset of the start of every CSV record (header first), plus the end offset.
+
+    Newlines inside quoted fields do not start a new record; doubled quotes ("")
+    toggle the quote state twice, so counting quote characters is enough.
+    """
+    offsets = array("Q", [0])
+    in_quotes = False
+    position = 0
+    with open(file_path, "rb") as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            start = 0
+            while True:
+                nl = chunk.find(b"\n", start)
+                if nl == -1:
+                    in_quotes ^= chunk.count(b'"', start) % 2 == 1
+                    break
+                in_quotes ^= chunk.count(b'"', start, nl) % 2 == 1
+                if not in_quotes:
+                    offsets.append(position + nl + 1)
+                start = nl + 1
+            position += len(chunk)
+    if offsets[-1] != position:
+        offsets.append(position)
+    return offsets
+
+
+def get_row_index(file_path):
+    """Row index for file_path, rebuilt only when the file's size or mtime changes."""
+    stat = os.stat(file_path)
+    signature = (stat.st_size, stat.st_mtime_ns)
+    with _cache_lock:
+        cached = _cache.get(file_path)
+        if cached and cached[0] == signature:
+            _cache.move_to_end(file_path)
+            return cached[1]
+
+    offsets = build_row_index(file_path)
+    with _cache_lock:
+        _cache[file_path] = (signature, offsets)
+        _cache.move_to_end(file_path)
+        while len(_cache) > MAX_CACHED_INDEXES:
+            _cache.popitem(last=False)
+    return offsets
+
+
+def _parse(raw):
+    return list(csv.reader(io.StringIO(raw.decode("utf-8"), newline="")))
+
+
+def read_page(file_path, offset=0, limit=100):
+    """Return (headers, rows, total_rows) for data rows [offset, offset + limit).
+
+    Only the header and the requested byte range are read from disk.
+    """
+    offsets = get_row_index(file_path)
+    total = max(len(offsets) - 2, 0)
+    offset = max(offset, 0)
+    end = total if limit is None else min(offset + max(limit, 0), total)
+
+    with open(file_path, "rb") as f:
+        headers_raw = f.read(offsets[1]) if len(offsets) > 1 else b""
+        rows = []
+        if offset < end:
+            f.seek(offsets[offset + 1])
+            rows = _parse(f.read(offsets[end + 1] - offsets[offset + 1]))
+    headers = _parse(headers_raw)
+    return (headers[0] if headers else []), rows, total
+
+
+def read_headers(file_path):
+    return read_page(file_path, 0, 0)[0]
+
+
+def iter_rows(file_path, offset=0, limit=None):
+    """Yield data rows [offset, offset + limit) streaming from disk, without loading the file."""
+    offsets = get_row_index(file_path)
+    total = max(len(offsets) - 2, 0)
+    offset = max(offset, 0)
+    end = total if limit is None else min(offset + max(limit, 0), total)
+    if offset >= end:
+        return
+    with open(file_path, "rb") as raw:
+        raw.seek(offsets[offset + 1])
+        text = io.TextIOWrapper(raw, encoding="utf-8", newline="")
+        for i, row in enumerate(csv.reader(text)):
+            if offset + i >= end:
+                break
+            yield row
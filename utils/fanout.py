@@ -0,0 +1,112 @@
+# fanout.py
+
+import contextvars
+import csv
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from utils.logger import get_logger
+from utils.output import open_writer
+
+logger = get_logger("fanout")
+
+ALL_SITES = "all"
+FANOUT_WORKERS = int(os.getenv("FANOUT_WORKERS", "4"))
+SITE_TIMEOUT = int(os.getenv("FANOUT_SITE_TIMEOUT", "300"))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Threads the per-site runs use. Long-lived, so each keeps its warm browser between fan-outs."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=FANOUT_WORKERS, thread_name_prefix="fanout")
+        return _executor
+
+
+def parse_sites(value, available):
+    """Site list from "all", "a,b" or ["a", "b"]; raises ValueError for unknown sites.
+
+    Returns a single-element list for a plain site name.
+    """
+    if value == ALL_SITES:
+        return list(available)
+    sites = value if isinstance(value, list) else str(value).split(",")
+    sites = list(dict.fromkeys(s.strip() for s in sites if s and s.strip()))
+    unknown = [s for s in sites if s not in available]
+    if unknown:
+        raise ValueError(f"Plugin not found for site: {', '.join(unknown)}")
+    if not sites:
+        raise ValueError("No site given")
+    return sites
+
+
+def run_sites(run_site, sites, timeout=SITE_TIMEOUT):
+    """Call run_site(site) for every site concurrently and return {site: result}.
+
+    A site that has not finished `timeout` seconds after the fan-out started gets
+    {"success": False, "timed_out": True}; it keeps running in the background but
+    nothing waits for it. Each site runs in a copy of the caller's context, so its
+    log records stay tagged with the caller's job.
+    """
+    started = time.monotonic()
+    futures = {site: get_executor().submit(contextvars.copy_context().run, run_site, site) for site in sites}
+    results = {}
+    for site, future in futures.items():
+        remaining = max(0, timeout - (time.monotonic() - started))
+        try:
+            results[site] = future.result(timeout=remaining)
+        except FutureTimeoutError:
+            logger.warning(f"{site} did not finish within {timeout}s, merging the rows it has so far")
+            results[site] = {"success": False, "timed_out": True, "error": f"Timed out after {timeout}s"}
+        except Exception as e:
+            results[site] = {"success": False, "error": str(e)}
+        results[site]["seconds"] = round(time.monotonic() - started, 3)
+    return results
+
+
+def _open_output(csv_path):
+    """Open the finished CSV, or its .part file while the run is still writing it; None if neither exists."""
+    # The .part file is renamed when the run finishes, so look at the final path again last.
+    for path in (csv_path, f"{csv_path}.part", csv_path):
+        try:
+            return open(path, newline="", encoding="utf-8")
+        except FileNotFoundError:
+            continue
+    return None
+
+
+def merge_outputs(site_files, output_path, output_format="csv", meta=None):
+    """Write the rows of every site's CSV into one output with a leading `source` column.
+
+    site_files is a list of (site, csv_path); columns are the union of their headers.
+    Returns the closed writer.
+    """
+    readers = []
+    for site, csv_path in site_files:
+        f = _open_output(csv_path)
+        if f is not None:
+            readers.append((site, f, csv.DictReader(f)))
+
+    fieldnames = ["source"]
+    for _, _, reader in readers:
+        fieldnames += [name for name in reader.fieldnames or [] if name not in fieldnames]
+
+    writer = open_writer(output_path, fieldnames, output_format, meta=meta)
+    error = None
+    try:
+        for site, _, reader in readers:
+            for row in reader:
+                writer.write(dict(row, source=site))
+    except Exception as e:
+        error = str(e)
+        logger.error(f"Merging fan-out results failed: {e}")
+    finally:
+        for _, f, _ in readers:
+            f.close()
+        writer.close(error)
+    return writer
@@ -1,3 +1,4 @@
+import inspect
 import os
 import re
 
@@ -6,3 +7,9 @@ def sanitize_filename(name):
 
 def ensure_data_dir():
     os.makedirs("data", exist_ok=True)
+
+def plugin_options(run_scraper, options):
+    """Keep only the options that run_scraper accepts as keyword arguments."""
+    params = inspect.signature(run_scraper).parameters
+    reserved = {"query", "output_file", "limit"}
+    return {k: v for k, v in (options or {}).items() if k in params and k not in reserved}
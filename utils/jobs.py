@@ -0,0 +1,117 @@
+# jobs.py
+
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from utils import progress
+from utils.logger import get_logger, job_context, log_buffers
+
+logger = get_logger("jobs")
+
+MAX_WORKERS = int(os.getenv("SCRAPER_MAX_WORKERS", "4"))
+MAX_FINISHED_JOBS = int(os.getenv("SCRAPER_MAX_FINISHED_JOBS", "200"))
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class JobManager:
+    """Run scrape jobs on a bounded thread pool and keep track of their status."""
+
+    def __init__(self, max_workers=MAX_WORKERS, max_finished=MAX_FINISHED_JOBS):
+        self.max_workers = max_workers
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="scrape-job")
+        self.max_finished = max_finished
+        self.jobs = {}
+        self.lock = threading.Lock()
+
+    def submit(self, func, job_site, job_query, job_limit=None, **kwargs):
+        """Queue func(**kwargs) and return the new job id straight away.
+
+        job_site/job_query/job_limit only describe the job in its status; func gets
+        its own site, query and limit through kwargs.
+        func must return a dict with "success" and either "file"/"count" or "error".
+        """
+        job_id = uuid.uuid4().hex
+        job = {
+            "id": job_id,
+            "site": job_site,
+            "query": job_query,
+            "limit": job_limit,
+            "status": QUEUED,
+            "count": 0,
+            "file": None,
+            "output_status": None,
+            "delta": None,
+            "sites": None,
+            "metrics": None,
+            "error": None,
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+        }
+        with self.lock:
+            self.jobs[job_id] = job
+        progress.hub.open(job_id)
+        self.executor.submit(self._run, job_id, func, kwargs)
+        logger.info(f"Queued job {job_id} ({job_site}: {job_query})")
+        return job_id
+
+    def _run(self, job_id, func, kwargs):
+        with job_context(job_id):
+            self._execute(job_id, func, kwargs)
+        job = self.get(job_id)
+        events = progress.hub.get(job_id)
+        if job and events:
+            events.close(progress.DONE, {k: job[k] for k in ("status", "count", "error", "output_status")})
+        self._prune()
+
+    def _execute(self, job_id, func, kwargs):
+        """Run one job; everything it logs lands in the job's own log buffer."""
+        self._update(job_id, status=RUNNING, started_at=time.time())
+        progress.publish(progress.STATUS, status=RUNNING)
+        try:
+            result = func(**kwargs) or {}
+        except Exception as e:
+            result = {"success": False, "error": str(e)}
+
+        if result.get("success"):
+            self._update(job_id, status=DONE, count=result.get("count", 0), file=result.get("file"),
+                         output_status=result.get("output_status"), delta=result.get("delta"),
+                         sites=result.get("sites"), metrics=result.get("metrics"), finished_at=time.time())
+            logger.info(f"Job {job_id} done with {result.get('count', 0)} rows")
+        else:
+            self._update(job_id, status=FAILED, error=result.get("error", "Unknown error"),
+                         finished_at=time.time())
+            logger.warning(f"Job {job_id} failed: {result.get('error')}")
+
+    def _update(self, job_id, **fields):
+        with self.lock:
+            if job_id in self.jobs:
+                self.jobs[job_id].update(fields)
+
+    def _prune(self):
+        """Forget the oldest finished jobs once more than max_finished are kept."""
+        with self.lock:
+            finished = [j for j in self.jobs.values() if j["status"] in (DONE, FAILED)]
+            if len(finished) <= self.max_finished:
+                return
+            finished.sort(key=lambda j: j["finished_at"])
+            for job in finished[:len(finished) - self.max_finished]:
+                del self.jobs[job["id"]]
+                log_buffers.discard(job["id"])
+                progress.hub.discard(job["id"])
+
+    def get(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+
+    def list(self):
+        with self.lock:
+            jobs = [dict(j) for j in self.jobs.values()]
+        return sorted(jobs, key=lambda j: j["created_at"], reverse=True)
@@ -1,43 +1,176 @@
 # logger.py
 
+import atexit
 import logging
+import logging.handlers
 import os
+import queue
+import threading
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from multiprocessing import util as multiprocessing_util
 
-# buffer for latest logs (per request)
-log_buffer = []
+LOG_DIR = "logs"
+FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+# Lines kept per job, jobs kept, and records waiting for the writer thread before new ones are dropped.
+LOG_BUFFER_LINES = int(os.getenv("LOG_BUFFER_LINES", "500"))
+LOG_BUFFER_JOBS = int(os.getenv("LOG_BUFFER_JOBS", "100"))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+_current_job = ContextVar("log_job", default=None)
+
+
+@contextmanager
+def job_context(job_id):
+    """Tag every record logged by this thread (and contexts copied from it) with job_id."""
+    token = _current_job.set(job_id)
+    try:
+        yield
+    finally:
+        _current_job.reset(token)
+
+
+def current_job():
+    return _current_job.get()
+
+
+class LogBuffers:
+    """Last LOG_BUFFER_LINES formatted lines of each job; the least recently written job is dropped past LOG_BUFFER_JOBS.
+
+    Records logged outside any job are kept under job_id None.
+    """
+
+    def __init__(self, max_lines=LOG_BUFFER_LINES, max_jobs=LOG_BUFFER_JOBS):
+        self.max_lines = max_lines
+        self.max_jobs = max_jobs
+        self.buffers = OrderedDict()
+        self.lock = threading.Lock()
+
+    def append(self, job_id, line):
+        with self.lock:
+            buffer = self.buffers.get(job_id)
+            if buffer is None:
+                buffer = self.buffers[job_id] = deque(maxlen=self.max_lines)
+                while len(self.buffers) > self.max_jobs:
+                    self.buffers.popitem(last=False)
+            else:
+                self.buffers.move_to_end(job_id)
+            buffer.append(line)
+
+    def lines(self, job_id, last=None):
+        with self.lock:
+            lines = list(self.buffers.get(job_id, ()))
+        return lines[-last:] if last else lines
+
+    def discard(self, job_id):
+        with self.lock:
+            self.buffers.pop(job_id, None)
+
+
+log_buffers = LogBuffers()
+
+
+class BufferHandler(logging.Handler):
+    """Appends formatted records to the ring buffer of the job they were logged under."""
 
-class BrowserLogHandler(logging.Handler):
     def emit(self, record):
-        msg = self.format(record)
-        log_buffer.append(msg)
+        log_buffers.append(getattr(record, "job_id", None), self.format(record))
 
-def get_logger(name):
-    log_dir = "logs"
-    os.makedirs(log_dir, exist_ok=True)
 
-    log_file = os.path.join(log_dir, f"{name}.log")
+class FileRouter(logging.Handler):
+    """Writes each record to logs/<logger name>.log, opening files on first use."""
 
-    logger = logging.getLogger(name)
-    logger.setLevel(logging.INFO)
+    def __init__(self):
+        super().__init__()
+        self.files = {}
+
+    def emit(self, record):
+        handler = self.files.get(record.name)
+        if handler is None:
+            os.makedirs(LOG_DIR, exist_ok=True)
+            handler = logging.FileHandler(os.path.join(LOG_DIR, f"{record.name}.log"), encoding="utf-8")
+            handler.setFormatter(self.formatter)
+            self.files[record.name] = handler
+        handler.emit(record)
+
+    def close(self):
+        for handler in self.files.values():
+            handler.close()
+        super().close()
+
+
+class _Pipeline:
+    """The queue and the listener thread that drains it into file, console and buffer handlers.
+
+    Rebuilt when the process id changes, because a forked worker (runner.py --batch)
+    inherits the queue but not the listener thread.
+    """
+
+    def __init__(self):
+        self.pid = None
+        self.queue = None
+        self.listener = None
+        self.dropped = 0
+        self.lock = threading.Lock()
+
+    def get_queue(self):
+        if self.pid != os.getpid():
+            with self.lock:
+                if self.pid != os.getpid():
+                    self._start()
+        return self.queue
+
+    def _start(self):
+        formatter = logging.Formatter(FORMAT)
+        handlers = [FileRouter(), logging.StreamHandler(), BufferHandler()]
+        for handler in handlers:
+            handler.setLevel(logging.INFO)
+            handler.setFormatter(formatter)
+        self.queue = queue.Queue(LOG_QUEUE_SIZE)
+        self.listener = logging.handlers.QueueListener(self.queue, *handlers, respect_handler_level=True)
+        self.listener.start()
+        self.pid = os.getpid()
+        # Pool workers leave through os._exit, which skips atexit but runs multiprocessing finalizers.
+        multiprocessing_util.Finalize(None, self.stop, exitpriority=10)
+
+    def stop(self):
+        """Flush what is queued and stop the listener. Records logged afterwards are dropped."""
+        with self.lock:
+            if self.listener is not None and self.pid == os.getpid():
+                self.listener.stop()
+                for handler in self.listener.handlers:
+                    handler.close()
+                self.listener = None
 
-    if not logger.handlers:
-        fh = logging.FileHandler(log_file, encoding="utf-8")
-        fh.setLevel(logging.INFO)
 
-        ch = logging.StreamHandler()
-        ch.setLevel(logging.INFO)
+_pipeline = _Pipeline()
+atexit.register(_pipeline.stop)
 
-        formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-        fh.setFormatter(formatter)
-        ch.setFormatter(formatter)
 
-        # add custom handler that stores logs in memory
-        bh = BrowserLogHandler()
-        bh.setLevel(logging.INFO)
-        bh.setFormatter(formatter)
+class JobQueueHandler(logging.handlers.QueueHandler):
+    """Tags records with the current job and queues them, so the logging thread never touches a file."""
 
-        logger.addHandler(fh)
-        logger.addHandler(ch)
-        logger.addHandler(bh)
+    def __init__(self):
+        super().__init__(None)
+
+    def prepare(self, record):
+        record = super().prepare(record)
+        record.job_id = _current_job.get()
+        return record
+
+    def enqueue(self, record):
+        try:
+            _pipeline.get_queue().put_nowait(record)
+        except queue.Full:
+            _pipeline.dropped += 1
+
+
+def get_logger(name):
+    logger = logging.getLogger(name)
+    logger.setLevel(logging.INFO)
+
+    if not logger.handlers:
+        logger.addHandler(JobQueueHandler())
 
     return logger
@@ -0,0 +1,180 @@
+# metrics.py
+
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+NO_PLUGIN = "none"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels):
+    return ",".join(f'{k}="{_escape(v)}"' for k, v in labels)
+
+
+class Counter:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            for key, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{{{_labels(key)}}} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets=BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = buckets
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            series = self.series.setdefault(key, {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0})
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["buckets"][i] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            for key, series in sorted(self.series.items()):
+                for bound, count in zip(self.buckets, series["buckets"]):
+                    lines.append(f"{self.name}_bucket{{{_labels(key + (('le', bound),))}}} {count}")
+                lines.append(f"{self.name}_bucket{{{_labels(key + (('le', '+Inf'),))}}} {series['count']}")
+                lines.append(f"{self.name}_sum{{{_labels(key)}}} {round(series['sum'], 6)}")
+                lines.append(f"{self.name}_count{{{_labels(key)}}} {series['count']}")
+        return lines
+
+
+PHASE_SECONDS = Histogram("scraper_phase_seconds", "Time spent in each scrape phase")
+RUN_SECONDS = Histogram("scraper_run_seconds", "Duration of whole plugin runs")
+RUNS = Counter("scraper_runs_total", "Plugin runs by final status")
+ROWS = Counter("scraper_rows_total", "Rows written to outputs")
+EVENTS = Counter("scraper_events_total", "Card failures, navigation retries and blocks")
+ALL_METRICS = [PHASE_SECONDS, RUN_SECONDS, RUNS, ROWS, EVENTS]
+
+_current_run = ContextVar("current_run", default=None)
+
+
+class RunMetrics:
+    """Phase timings and event counts of one plugin run, also fed into the process-wide metrics."""
+
+    def __init__(self, plugin):
+        self.plugin = plugin
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.events = {}
+        self.rows = 0
+        self.status = None
+
+    def observe(self, phase_name, seconds):
+        stats = self.phases.setdefault(phase_name, {"count": 0, "total": 0.0, "max": 0.0})
+        stats["count"] += 1
+        stats["total"] += seconds
+        stats["max"] = max(stats["max"], seconds)
+
+    def breakdown(self):
+        """Per-phase count/total/avg/max seconds, event counts and rows, for API responses."""
+        return {
+            "seconds": round(time.perf_counter() - self.started, 3),
+            "rows": self.rows,
+            "phases": {
+                name: {
+                    "count": s["count"],
+                    "total": round(s["total"], 3),
+                    "avg": round(s["total"] / s["count"], 4),
+                    "max": round(s["max"], 3),
+                }
+                for name, s in self.phases.items()
+            },
+            "events": dict(self.events),
+        }
+
+
+def current_plugin():
+    run = _current_run.get()
+    return run.plugin if run else NO_PLUGIN
+
+
+@contextmanager
+def track_run(plugin):
+    """Make a RunMetrics the current run for phase()/count()/row() calls in this thread.
+
+    Set run.status before leaving ("complete", "partial", "blocked", ...); it
+    defaults to "failed" if an exception escapes and "complete" otherwise.
+    """
+    run = RunMetrics(plugin)
+    token = _current_run.set(run)
+    try:
+        yield run
+    except BaseException:
+        run.status = run.status or "failed"
+        raise
+    finally:
+        _current_run.reset(token)
+        RUN_SECONDS.observe(time.perf_counter() - run.started, plugin=plugin)
+        RUNS.inc(plugin=plugin, status=run.status or "complete")
+
+
+def observe(phase_name, seconds):
+    run = _current_run.get()
+    if run is not None:
+        run.observe(phase_name, seconds)
+    PHASE_SECONDS.observe(seconds, plugin=current_plugin(), phase=phase_name)
+
+
+@contextmanager
+def phase(phase_name):
+    """Time the enclosed block as phase_name of the current run (exceptions included)."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(phase_name, time.perf_counter() - started)
+
+
+def count(event, amount=1):
+    """Count an event ("card_failures", "retries", "blocked") for the current run's plugin."""
+    run = _current_run.get()
+    if run is not None:
+        run.events[event] = run.events.get(event, 0) + amount
+    EVENTS.inc(amount, plugin=current_plugin(), event=event)
+
+
+def row():
+    """Count a row written by the current run (rows written outside a run, like fan-out merges, are not counted)."""
+    run = _current_run.get()
+    if run is None:
+        return
+    run.rows += 1
+    ROWS.inc(plugin=run.plugin)
+
+
+def render(extra_lines=()):
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in ALL_METRICS:
+        lines.extend(metric.render())
+    lines.extend(extra_lines)
+    return "\n".join(lines) + "\n"
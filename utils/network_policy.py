@@ -0,0 +1,92 @@
+# network_policy.py
+
+import re
+import threading
+
+# Requests every plugin can do without: trackers and ad networks.
+ANALYTICS_PATTERNS = [
+    r"google-analytics\.com",
+    r"googletagmanager\.com",
+    r"doubleclick\.net",
+    r"googlesyndication\.com",
+    r"facebook\.(net|com)/tr",
+    r"connect\.facebook\.net",
+    r"hotjar\.com",
+    r"clarity\.ms",
+]
+
+
+class NetworkPolicy:
+    """Route-interception policy a plugin declares for its BrowserContext.
+
+    A request is aborted when its resource type is in block_resource_types or its URL
+    matches one of block_url_patterns, unless it matches allow_url_patterns. Other
+    requests fall back to any route installed before (e.g. a HAR replay), else the network.
+    """
+
+    def __init__(self, block_resource_types=(), block_url_patterns=(), allow_url_patterns=()):
+        self.block_resource_types = set(block_resource_types)
+        self.block_url = [re.compile(p) for p in block_url_patterns]
+        self.allow_url = [re.compile(p) for p in allow_url_patterns]
+
+    def should_block(self, url, resource_type):
+        if any(p.search(url) for p in self.allow_url):
+            return False
+        if resource_type in self.block_resource_types:
+            return True
+        return any(p.search(url) for p in self.block_url)
+
+    def apply(self, context):
+        """Install the policy on context and return the NetworkStats it will fill in."""
+        stats = NetworkStats()
+
+        def handle(route):
+            request = route.request
+            if self.should_block(request.url, request.resource_type):
+                stats.blocked(request.resource_type)
+                route.abort()
+            else:
+                route.fallback()
+
+        def on_response(response):
+            try:
+                length = int(response.headers.get("content-length", 0))
+            except ValueError:
+                length = 0
+            stats.loaded(length)
+
+        context.route("**/*", handle)
+        context.on("response", on_response)
+        return stats
+
+
+class NetworkStats:
+    """Requests blocked (by resource type) and requests/bytes actually loaded during a run.
+
+    Aborted requests never download, so their size is unknown; loaded_bytes (from
+    Content-Length) is what shows the saving when comparing runs.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.blocked_by_type = {}
+        self.loaded_requests = 0
+        self.loaded_bytes = 0
+
+    def blocked(self, resource_type):
+        with self.lock:
+            self.blocked_by_type[resource_type] = self.blocked_by_type.get(resource_type, 0) + 1
+
+    def loaded(self, length):
+        with self.lock:
+            self.loaded_requests += 1
+            self.loaded_bytes += length
+
+    def summary(self):
+        with self.lock:
+            return {
+                "blocked_requests": sum(self.blocked_by_type.values()),
+                "blocked_by_type": dict(self.blocked_by_type),
+                "loaded_requests": self.loaded_requests,
+                "loaded_bytes": self.loaded_bytes,
+            }
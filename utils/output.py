@@ -0,0 +1,340 @@
+# output.py
+
+import csv
+import gzip
+import hashlib
+import io
+import json
+import os
+import re
+import sqlite3
+import time
+import uuid
+from utils import metrics, progress
+from utils.logger import get_logger
+from utils.result_store import get_store
+
+logger = get_logger("output")
+
+COMPLETE = "complete"
+PARTIAL = "partial"
+
+PARQUET_ROW_GROUP = 500
+# "1,234" or "-12,345.5": commas that are real thousands separators.
+THOUSANDS_RE = re.compile(r"^[+-]?\d{1,3}(,\d{3})+(\.\d+)?$")
+
+
+def meta_path(filepath):
+    """Metadata sidecar that sits next to an output file."""
+    return f"{filepath}.meta.json"
+
+
+def write_meta(filepath, meta):
+    """Write the sidecar for filepath atomically."""
+    tmp_path = f"{meta_path(filepath)}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+    os.replace(tmp_path, meta_path(filepath))
+
+
+def read_meta(filepath):
+    """Sidecar contents for filepath, or None if it has none (e.g. files from older runs)."""
+    try:
+        with open(meta_path(filepath), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def file_sha256(filepath):
+    digest = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class _HashingFile:
+    """File wrapper that feeds everything written through it into a SHA-256 and a byte count."""
+
+    def __init__(self, file):
+        self.file = file
+        self.digest = hashlib.sha256()
+        self.bytes = 0
+
+    def write(self, data):
+        raw = data.encode("utf-8") if isinstance(data, str) else data
+        self.digest.update(raw)
+        self.bytes += len(raw)
+        return self.file.write(data)
+
+    def flush(self):
+        self.file.flush()
+
+
+def coerce(value, column_type):
+    """Convert a scraped string to column_type ("int" or "float"); None when it is missing or unparsable.
+
+    Commas are only dropped as thousands separators ("1,234"); "4,5" is ambiguous and unparsable.
+    """
+    if value is None:
+        return None
+    text = str(value).strip()
+    if THOUSANDS_RE.match(text):
+        text = text.replace(",", "")
+    if text in ("", "N/A"):
+        return None
+    try:
+        return int(float(text)) if column_type == "int" else float(text)
+    except ValueError:
+        return None
+
+
+class StreamingWriter:
+    """Append rows to an output file as they are scraped, flushing each one.
+
+    Rows go to `<file>.part`, which can be read while the scrape runs. close() renames
+    it onto the final path atomically and writes the `<file>.meta.json` sidecar:
+    status ("complete", or "partial" with the error when the scrape failed, so rows
+    collected before a crash are kept), headers, row count, byte size, SHA-256,
+    timings and whatever run details (plugin, query, ...) were passed as meta.
+
+    When meta names the plugin and query, every row is also recorded in the
+    SQLite result store under a run_id that the sidecar carries too.
+
+    Subclasses implement _open(), _write(row) and _finish(), and return
+    (bytes, sha256) from _finish().
+    """
+
+    format = None
+
+    def __init__(self, filepath, fieldnames, meta=None, column_types=None):
+        self.filepath = os.path.abspath(filepath)
+        self.partial_path = f"{self.filepath}.part"
+        self.fieldnames = fieldnames
+        self.column_types = column_types or {}
+        self.meta = dict(meta or {})
+        self.meta.setdefault("run_id", uuid.uuid4().hex)
+        self.rows = 0
+        self.status = None
+        self.started_at = time.time()
+        os.makedirs(os.path.dirname(self.filepath), exist_ok=True)
+        self._open()
+        self.records = self._start_records()
+        # Merged fan-out outputs carry no plugin; their rows were already streamed by each site.
+        self.source = self.meta.get("plugin")
+        if self.source:
+            progress.publish(progress.FIELDS, source=self.source, fields=list(fieldnames))
+
+    def _start_records(self):
+        store = get_store() if "plugin" in self.meta and "query" in self.meta else None
+        if store is None:
+            return None
+        try:
+            return store.start_run(self.meta["run_id"], self.meta["plugin"], self.meta["query"], self.filepath)
+        except sqlite3.Error as e:
+            logger.warning(f"Result store unavailable, rows will only go to {self.filepath}: {e}")
+            return None
+
+    def _record(self, method, *args):
+        """Forward to the run's RecordBatch; a store failure never fails the scrape."""
+        if self.records is None:
+            return
+        try:
+            getattr(self.records, method)(*args)
+        except sqlite3.Error as e:
+            logger.warning(f"Result store write failed, stopped recording run {self.meta['run_id']}: {e}")
+            self.records = None
+
+    def typed(self, row):
+        """Row restricted to fieldnames with column_types applied."""
+        return {
+            name: coerce(row.get(name), self.column_types[name]) if name in self.column_types else row.get(name)
+            for name in self.fieldnames
+        }
+
+    def write(self, row):
+        with metrics.phase("write"):
+            self._write(row)
+            self.rows += 1
+            self._record("add", row)
+        metrics.row()
+        if self.source:
+            progress.publish(progress.ROW, source=self.source, n=self.rows,
+                             row={name: row.get(name) for name in self.fieldnames})
+
+    def close(self, error=None, timings=None):
+        """Finish the file and return its status ("complete" or "partial")."""
+        if self.status is not None:
+            return self.status
+        with metrics.phase("save"):
+            size, sha256 = self._finish()
+            os.replace(self.partial_path, self.filepath)
+            self.status = PARTIAL if error else COMPLETE
+            self._record("close", self.status)
+        finished_at = time.time()
+        write_meta(self.filepath, dict(
+            self.meta,
+            status=self.status,
+            error=error,
+            format=self.format,
+            headers=list(self.fieldnames),
+            column_types=self.column_types,
+            rows=self.rows,
+            bytes=size,
+            sha256=sha256,
+            started_at=self.started_at,
+            finished_at=finished_at,
+            duration_seconds=round(finished_at - self.started_at, 3),
+            timings=timings or {},
+        ))
+        if error:
+            logger.warning(f"Saved {self.rows} rows to {self.filepath} before failing: {error}")
+        else:
+            logger.info(f"Scraping completed. Output saved to {self.filepath}")
+        return self.status
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close(error=str(exc) if exc else None)
+        return False
+
+
+class StreamingCSVWriter(StreamingWriter):
+    """Plain CSV, exactly as the plugins always wrote it (values are not type-converted)."""
+
+    format = "csv"
+
+    def _open(self):
+        self.file = open(self.partial_path, "w", newline="", encoding="utf-8")
+        self.out = _HashingFile(self.file)
+        self.writer = csv.DictWriter(self.out, fieldnames=self.fieldnames, extrasaction="ignore")
+        self.writer.writeheader()
+        self.file.flush()
+
+    def _write(self, row):
+        self.writer.writerow(row)
+        self.file.flush()
+
+    def _finish(self):
+        self.file.close()
+        return self.out.bytes, self.out.digest.hexdigest()
+
+
+class GzipCSVWriter(StreamingWriter):
+    """gzip-compressed CSV.
+
+    Each row is sync-flushed, so a streaming decompressor (zlib.decompressobj(wbits=31),
+    zcat) reads every row written so far from the partial file. gzip.open().read()
+    raises EOFError on it until close() writes the gzip trailer.
+    """
+
+    format = "csv.gz"
+
+    def _open(self):
+        self.raw = open(self.partial_path, "wb")
+        self.out = _HashingFile(self.raw)
+        self.gzip = gzip.GzipFile(fileobj=self.out, mode="wb", filename="")
+        self.text = io.TextIOWrapper(self.gzip, encoding="utf-8", newline="")
+        self.writer = csv.DictWriter(self.text, fieldnames=self.fieldnames, extrasaction="ignore")
+        self.writer.writeheader()
+        self._flush()
+
+    def _flush(self):
+        self.text.flush()
+        self.gzip.flush()
+
+    def _write(self, row):
+        self.writer.writerow(row)
+        self._flush()
+
+    def _finish(self):
+        self.text.close()
+        self.raw.close()
+        return self.out.bytes, self.out.digest.hexdigest()
+
+
+class JSONLinesWriter(StreamingWriter):
+    """One JSON object per line, with column_types applied (missing values become null)."""
+
+    format = "jsonl"
+
+    def _open(self):
+        self.file = open(self.partial_path, "w", encoding="utf-8")
+        self.out = _HashingFile(self.file)
+
+    def _write(self, row):
+        self.out.write(json.dumps(self.typed(row), ensure_ascii=False) + "\n")
+        self.file.flush()
+
+    def _finish(self):
+        self.file.close()
+        return self.out.bytes, self.out.digest.hexdigest()
+
+
+class ParquetWriter(StreamingWriter):
+    """Parquet with typed columns, written in row groups of PARQUET_ROW_GROUP rows.
+
+    Needs pyarrow. The file is only readable once close() writes the footer.
+    """
+
+    format = "parquet"
+    ARROW_TYPES = {"int": "int64", "float": "float64"}
+
+    def _open(self):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet output needs pyarrow: pip install pyarrow")
+        self.pa = pa
+        self.schema = pa.schema([
+            (name, getattr(pa, self.ARROW_TYPES.get(self.column_types.get(name), "string"))())
+            for name in self.fieldnames
+        ])
+        self.writer = pq.ParquetWriter(self.partial_path, self.schema, compression="snappy")
+        self.buffer = []
+
+    def _flush(self):
+        if self.buffer:
+            self.writer.write_table(self.pa.Table.from_pylist(self.buffer, schema=self.schema))
+            self.buffer = []
+
+    def _write(self, row):
+        self.buffer.append(self.typed(row))
+        if len(self.buffer) >= PARQUET_ROW_GROUP:
+            self._flush()
+
+    def _finish(self):
+        self._flush()
+        self.writer.close()
+        return os.path.getsize(self.partial_path), file_sha256(self.partial_path)
+
+
+WRITERS = {
+    "csv": StreamingCSVWriter,
+    "csv.gz": GzipCSVWriter,
+    "jsonl": JSONLinesWriter,
+    "parquet": ParquetWriter,
+}
+OUTPUT_FORMATS = tuple(WRITERS)
+
+
+def with_format_extension(filepath, output_format):
+    """Swap a trailing .csv (or any known output extension) for the one matching output_format."""
+    for fmt in sorted(OUTPUT_FORMATS, key=len, reverse=True):
+        if filepath.endswith(f".{fmt}"):
+            filepath = filepath[:-len(fmt) - 1]
+            break
+    return f"{filepath}.{output_format}"
+
+
+def open_writer(filepath, fieldnames, output_format="csv", meta=None, column_types=None):
+    """Streaming writer for output_format; for non-CSV formats filepath's extension is adjusted to match."""
+    if output_format not in WRITERS:
+        raise ValueError(f"Unknown output format {output_format!r}, expected one of {', '.join(OUTPUT_FORMATS)}")
+    if output_format != "csv":
+        filepath = with_format_extension(filepath, output_format)
+    return WRITERS[output_format](filepath, fieldnames, meta=meta, column_types=column_types)
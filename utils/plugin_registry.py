@@ -0,0 +1,198 @@
+# plugin_registry.py
+
+import ast
+import importlib
+import os
+import threading
+from utils.logger import get_logger
+
+logger = get_logger("plugin_registry")
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PLUGIN_DIR = os.path.join(BASE_DIR, "plugins")
+
+# Passed by the app/runner themselves, so not plugin options.
+RESERVED_ARGS = ("query", "output_file", "limit")
+
+_UNRESOLVED = object()
+
+
+def _resolve(node, constants):
+    """Value of a module-level expression, as far as it can be known without running it.
+
+    Handles literals, names of other module-level constants, os.getenv(name, default)
+    (the default) and int()/float() around those.
+    """
+    try:
+        return ast.literal_eval(node)
+    except (ValueError, TypeError, SyntaxError):
+        pass
+    if isinstance(node, ast.Name):
+        return constants.get(node.id, _UNRESOLVED)
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Add):
+        left, right = _resolve(node.left, constants), _resolve(node.right, constants)
+        if _UNRESOLVED not in (left, right):
+            try:
+                return left + right
+            except TypeError:
+                return _UNRESOLVED
+    if isinstance(node, ast.Call):
+        func = ast.unparse(node.func)
+        if func in ("os.getenv", "os.environ.get") and len(node.args) == 2:
+            return _resolve(node.args[1], constants)
+        if func in ("int", "float") and len(node.args) == 1:
+            value = _resolve(node.args[0], constants)
+            if value is not _UNRESOLVED:
+                try:
+                    return int(value) if func == "int" else float(value)
+                except (TypeError, ValueError):
+                    return _UNRESOLVED
+    return _UNRESOLVED
+
+
+def read_metadata(path):
+    """Plugin metadata read from its source with ast, without importing it (or Playwright).
+
+    Returns description, fields (FIELDS plus any other *_FIELDS lists), the options
+    run_scraper accepts with their defaults, the run_scraper arguments, and choices
+    for options that have a matching plural constant (MODES for mode).
+    """
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=path)
+
+    constants = {}
+    run_scraper = None
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+            value = _resolve(node.value, constants)
+            if value is not _UNRESOLVED:
+                constants[node.targets[0].id] = value
+        elif isinstance(node, ast.FunctionDef) and node.name == "run_scraper":
+            run_scraper = node
+
+    fields = {}
+    for name, value in constants.items():
+        if (name == "FIELDS" or name.endswith("_FIELDS")) and isinstance(value, list):
+            fields[name] = value
+
+    args, options = [], {}
+    if run_scraper is not None:
+        positional = run_scraper.args.args
+        defaults = [None] * (len(positional) - len(run_scraper.args.defaults)) + run_scraper.args.defaults
+        params = list(zip(positional, defaults)) + list(zip(run_scraper.args.kwonlyargs, run_scraper.args.kw_defaults))
+        for arg, default in params:
+            args.append(arg.arg)
+            if arg.arg in RESERVED_ARGS or default is None:
+                continue
+            value = _resolve(default, constants)
+            options[arg.arg] = None if value is _UNRESOLVED else value
+
+    return {
+        "description": constants.get("description") if isinstance(constants.get("description"), str) else None,
+        "has_run_scraper": run_scraper is not None,
+        "args": args,
+        "fields": fields,
+        "options": options,
+        "choices": {
+            name.lower()[:-1]: list(value) for name, value in constants.items()
+            if name.endswith("S") and name.lower()[:-1] in options and isinstance(value, (list, tuple))
+        },
+    }
+
+
+class PluginRegistry:
+    """Plugins in plugin_dir, with their metadata and loaded modules cached.
+
+    The directory is re-listed only when its mtime changes (a plugin was added or
+    removed); metadata is re-read and a loaded module reloaded when its file's
+    mtime changes. Listing plugins therefore costs a couple of os.stat calls.
+    """
+
+    def __init__(self, plugin_dir=PLUGIN_DIR, package="plugins"):
+        self.plugin_dir = plugin_dir
+        self.package = package
+        self.lock = threading.Lock()
+        self.dir_mtime = None
+        self.names = []
+        self.metadata_cache = {}
+        self.modules = {}
+
+    def path(self, name):
+        return os.path.join(self.plugin_dir, f"{name}.py")
+
+    def _mtime(self, name):
+        try:
+            return os.stat(self.path(name)).st_mtime_ns
+        except OSError:
+            return None
+
+    def list(self):
+        """Sorted plugin names."""
+        mtime = os.stat(self.plugin_dir).st_mtime_ns
+        with self.lock:
+            if mtime != self.dir_mtime:
+                self.names = sorted(
+                    f[:-3] for f in os.listdir(self.plugin_dir)
+                    if f.endswith(".py") and f != "__init__.py"
+                )
+                self.dir_mtime = mtime
+            return list(self.names)
+
+    def __contains__(self, name):
+        return name in self.list()
+
+    def metadata(self, name):
+        """Metadata for one plugin (see read_metadata), or None if there is no such plugin."""
+        mtime = self._mtime(name)
+        if mtime is None:
+            return None
+        with self.lock:
+            cached = self.metadata_cache.get(name)
+            if cached and cached[0] == mtime:
+                return cached[1]
+        try:
+            meta = read_metadata(self.path(name))
+        except (OSError, SyntaxError) as e:
+            logger.warning(f"Could not read plugin {name}: {e}")
+            meta = {"description": None, "has_run_scraper": False, "args": [], "fields": {}, "options": {},
+                    "choices": {}, "error": str(e)}
+        with self.lock:
+            self.metadata_cache[name] = (mtime, meta)
+        return meta
+
+    def describe(self):
+        """{name: metadata} for every plugin."""
+        return {name: self.metadata(name) for name in self.list()}
+
+    def load(self, name):
+        """Imported plugin module, imported once and reloaded when its file changes.
+
+        Raises ModuleNotFoundError for unknown plugins.
+        """
+        mtime = self._mtime(name)
+        if mtime is None:
+            raise ModuleNotFoundError(f"No plugin named {name!r}")
+        with self.lock:
+            cached = self.modules.get(name)
+            if cached and cached[0] == mtime:
+                return cached[1]
+            if cached:
+                logger.info(f"Plugin {name} changed on disk, reloading")
+                module = importlib.reload(cached[1])
+            else:
+                module = importlib.import_module(f"{self.package}.{name}")
+            self.modules[name] = (mtime, module)
+            return module
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """Process-wide PluginRegistry for the plugins/ package."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = PluginRegistry()
+        return _registry
@@ -0,0 +1,327 @@
+# politeness.py
+
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlparse
+from utils import metrics
+from utils.logger import get_logger
+
+logger = get_logger("politeness")
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DB_PATH = os.getenv("POLITENESS_DB", os.path.join(BASE_DIR, "data", "politeness.db"))
+ENABLED = os.getenv("POLITENESS_ENABLED", "1") != "0"
+
+# (requests per second, burst, concurrent sessions). POLITENESS_LIMITS takes a JSON
+# object like {"www.google.com": [1, 5, 2]} to override or add domains.
+DEFAULT_LIMITS = (1.0, 5, 2)
+DOMAIN_LIMITS = {
+    "www.google.com": (2.0, 10, 2),
+    "dir.indiamart.com": (1.0, 5, 2),
+}
+
+
+def parse_limits(text):
+    """Domain limits from the POLITENESS_LIMITS JSON; malformed JSON and bad entries are logged and ignored."""
+    try:
+        overrides = json.loads(text or "{}")
+    except ValueError as e:
+        logger.warning(f"Ignoring POLITENESS_LIMITS, not valid JSON: {e}")
+        return {}
+    if not isinstance(overrides, dict):
+        logger.warning("Ignoring POLITENESS_LIMITS, expected an object of domain: [rate, burst, sessions]")
+        return {}
+
+    limits = {}
+    for domain, value in overrides.items():
+        try:
+            rate, burst, sessions = (float(v) for v in value) if isinstance(value, list) else ()
+        except (TypeError, ValueError):
+            rate = None
+        if rate is None or rate <= 0 or burst < 1 or sessions < 1:
+            logger.warning(f"Ignoring POLITENESS_LIMITS entry for {domain}: {value!r}; "
+                           "expected [rate > 0, burst >= 1, sessions >= 1]")
+            continue
+        limits[domain] = (rate, burst, int(sessions))
+    return limits
+
+
+DOMAIN_LIMITS.update(parse_limits(os.getenv("POLITENESS_LIMITS")))
+
+BACKOFF_BASE = float(os.getenv("POLITENESS_BACKOFF_BASE", "5"))
+BACKOFF_MAX = float(os.getenv("POLITENESS_BACKOFF_MAX", "300"))
+WAIT_TIMEOUT = float(os.getenv("POLITENESS_WAIT_TIMEOUT", "600"))
+MAX_RETRIES = 2
+# Leases of threads that died without releasing them are dropped after this long.
+LEASE_MAX_AGE = 3600
+
+BLOCK_STATUSES = (429, 503)
+BLOCK_URL_MARKERS = ("/sorry/", "captcha")
+CAPTCHA_SELECTOR = "iframe[src*='recaptcha'], #captcha-form, form[action*='captcha']"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS domains (
+    domain TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    backoff_until REAL NOT NULL DEFAULT 0,
+    failures INTEGER NOT NULL DEFAULT 0,
+    last_block TEXT,
+    requests INTEGER NOT NULL DEFAULT 0,
+    waited_seconds REAL NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS leases (
+    id INTEGER PRIMARY KEY,
+    domain TEXT NOT NULL,
+    pid INTEGER NOT NULL,
+    acquired_at REAL NOT NULL
+);
+"""
+
+
+def domain_of(url_or_domain):
+    return urlparse(url_or_domain).hostname if "://" in url_or_domain else url_or_domain
+
+
+def limits_for(domain):
+    return DOMAIN_LIMITS.get(domain, DEFAULT_LIMITS)
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def detect_block(page, response=None):
+    """Reason the site is refusing us (429/503, a /sorry/ or captcha page), or None."""
+    if response is not None and response.status in BLOCK_STATUSES:
+        return f"HTTP {response.status}"
+    url = page.url.lower()
+    marker = next((m for m in BLOCK_URL_MARKERS if m in url), None)
+    if marker:
+        return f"redirected to {marker.strip('/')} page"
+    try:
+        if page.locator(CAPTCHA_SELECTOR).count():
+            return "captcha on page"
+    except Exception:
+        pass
+    return None
+
+
+class BlockedError(Exception):
+    """The site kept answering with a block page after MAX_RETRIES backoffs."""
+
+
+class PolitenessScheduler:
+    """Per-domain token buckets, concurrency caps and backoff shared by every plugin.
+
+    State lives in a SQLite file, so threads of one process and runner.py worker
+    processes all draw from the same buckets. Each change is a short BEGIN IMMEDIATE
+    transaction; waiting happens outside it.
+
+    session(domain) holds one of the domain's concurrent-session slots for a whole
+    scrape; wait(domain) takes one token before each navigation or scroll and also
+    sleeps out any backoff; report_block() starts a jittered exponential backoff.
+    """
+
+    def __init__(self, db_path=DB_PATH, enabled=ENABLED):
+        self.db_path = db_path
+        self.enabled = enabled
+        self.local = threading.local()
+        if enabled:
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+            self.connection().executescript(SCHEMA)
+
+    def connection(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self.local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self.connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _row(self, conn, domain, now):
+        row = conn.execute("SELECT * FROM domains WHERE domain = ?", (domain,)).fetchone()
+        if row is None:
+            burst = limits_for(domain)[1]
+            conn.execute("INSERT INTO domains (domain, tokens, updated_at) VALUES (?, ?, ?)", (domain, burst, now))
+            row = conn.execute("SELECT * FROM domains WHERE domain = ?", (domain,)).fetchone()
+        return row
+
+    def _try_take(self, domain, cost):
+        """Take cost tokens if available; otherwise return how many seconds to wait."""
+        rate, burst, _ = limits_for(domain)
+        now = time.time()
+        with self._transaction() as conn:
+            row = self._row(conn, domain, now)
+            if row["backoff_until"] > now:
+                return row["backoff_until"] - now
+            tokens = min(burst, row["tokens"] + (now - row["updated_at"]) * rate)
+            if tokens >= cost:
+                conn.execute(
+                    "UPDATE domains SET tokens = ?, updated_at = ?, requests = requests + 1 WHERE domain = ?",
+                    (tokens - cost, now, domain),
+                )
+                return 0
+            conn.execute("UPDATE domains SET tokens = ?, updated_at = ? WHERE domain = ?", (tokens, now, domain))
+            return (cost - tokens) / rate
+
+    def wait(self, url_or_domain, cost=1.0, timeout=WAIT_TIMEOUT):
+        """Block until the domain's bucket has cost tokens (and any backoff is over), then take them."""
+        if not self.enabled:
+            return 0
+        domain = domain_of(url_or_domain)
+        started = time.time()
+        while True:
+            delay = self._try_take(domain, cost)
+            if delay <= 0:
+                break
+            if time.time() - started + delay > timeout:
+                raise TimeoutError(f"Waited over {timeout}s for a request slot on {domain}")
+            time.sleep(delay + random.uniform(0, 0.1))
+        waited = time.time() - started
+        metrics.observe("politeness_wait", waited)
+        if waited > 0.05:
+            with self._transaction() as conn:
+                conn.execute("UPDATE domains SET waited_seconds = waited_seconds + ? WHERE domain = ?",
+                             (waited, domain))
+        return waited
+
+    @contextmanager
+    def session(self, url_or_domain, timeout=WAIT_TIMEOUT):
+        """Hold one of the domain's concurrent-session slots for the duration of a scrape."""
+        if not self.enabled:
+            yield
+            return
+        domain = domain_of(url_or_domain)
+        max_sessions = limits_for(domain)[2]
+        started = time.time()
+        lease_id = None
+        while lease_id is None:
+            with self._transaction() as conn:
+                conn.execute("DELETE FROM leases WHERE acquired_at < ?", (time.time() - LEASE_MAX_AGE,))
+                for lease in conn.execute("SELECT id, pid FROM leases WHERE domain = ?", (domain,)).fetchall():
+                    if not _pid_alive(lease["pid"]):
+                        conn.execute("DELETE FROM leases WHERE id = ?", (lease["id"],))
+                active = conn.execute("SELECT COUNT(*) FROM leases WHERE domain = ?", (domain,)).fetchone()[0]
+                if active < max_sessions:
+                    lease_id = conn.execute(
+                        "INSERT INTO leases (domain, pid, acquired_at) VALUES (?, ?, ?)",
+                        (domain, os.getpid(), time.time()),
+                    ).lastrowid
+            if lease_id is None:
+                if time.time() - started > timeout:
+                    raise TimeoutError(f"Waited over {timeout}s for one of {max_sessions} sessions on {domain}")
+                time.sleep(random.uniform(0.5, 1.5))
+        if time.time() - started > 1:
+            logger.info(f"Waited {time.time() - started:.1f}s for a session on {domain}")
+        try:
+            yield
+        finally:
+            with self._transaction() as conn:
+                conn.execute("DELETE FROM leases WHERE id = ?", (lease_id,))
+
+    def report_block(self, url_or_domain, reason):
+        """Back the domain off for BACKOFF_BASE * 2^failures seconds (jittered, capped at BACKOFF_MAX)."""
+        if not self.enabled:
+            return 0
+        domain = domain_of(url_or_domain)
+        now = time.time()
+        with self._transaction() as conn:
+            row = self._row(conn, domain, now)
+            delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** row["failures"]) * random.uniform(0.5, 1.5)
+            conn.execute(
+                "UPDATE domains SET backoff_until = ?, failures = failures + 1, last_block = ?, tokens = 0,"
+                " updated_at = ? WHERE domain = ?",
+                (max(row["backoff_until"], now + delay), f"{reason} at {time.strftime('%H:%M:%S')}", now, domain),
+            )
+        logger.warning(f"{domain} is blocking us ({reason}); backing off {delay:.1f}s")
+        return delay
+
+    def report_ok(self, url_or_domain):
+        """Reset the backoff exponent after a successful request."""
+        if not self.enabled:
+            return
+        with self._transaction() as conn:
+            conn.execute("UPDATE domains SET failures = 0 WHERE domain = ? AND failures > 0",
+                         (domain_of(url_or_domain),))
+
+    def goto(self, page, url, retries=MAX_RETRIES, **goto_options):
+        """page.goto(url) paced by the domain's bucket, backing off and retrying when blocked.
+
+        Raises BlockedError if the site still blocks after `retries` backoffs.
+        """
+        for attempt in range(retries + 1):
+            if attempt:
+                metrics.count("retries")
+            self.wait(url)
+            with metrics.phase("goto"):
+                response = page.goto(url, **goto_options)
+            reason = detect_block(page, response)
+            if reason is None:
+                self.report_ok(url)
+                return response
+            metrics.count("blocks")
+            self.report_block(url, reason)
+        metrics.count("blocked")
+        raise BlockedError(f"{domain_of(url)} is blocking requests: {reason}")
+
+    def state(self):
+        """Every domain's bucket, backoff and active sessions, for /api/politeness."""
+        if not self.enabled:
+            return {"enabled": False, "domains": []}
+        now = time.time()
+        conn = self.connection()
+        active = dict(conn.execute("SELECT domain, COUNT(*) FROM leases GROUP BY domain").fetchall())
+        domains = []
+        for row in conn.execute("SELECT * FROM domains ORDER BY domain").fetchall():
+            rate, burst, max_sessions = limits_for(row["domain"])
+            domains.append({
+                "domain": row["domain"],
+                "rate_per_sec": rate,
+                "burst": burst,
+                "tokens": round(min(burst, row["tokens"] + (now - row["updated_at"]) * rate), 2),
+                "max_sessions": max_sessions,
+                "active_sessions": active.get(row["domain"], 0),
+                "backoff_seconds": round(max(0, row["backoff_until"] - now), 1),
+                "failures": row["failures"],
+                "last_block": row["last_block"],
+                "requests": row["requests"],
+                "waited_seconds": round(row["waited_seconds"], 1),
+            })
+        return {"enabled": True, "domains": domains}
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """Process-wide PolitenessScheduler (a pass-through when POLITENESS_ENABLED=0)."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = PolitenessScheduler()
+        return _scheduler
@@ -0,0 +1,88 @@
+# progress.py
+
+import os
+import threading
+import time
+from collections import deque
+from utils.logger import current_job
+
+# Events kept per job for clients that connect late or reconnect with Last-Event-ID.
+EVENT_BUFFER = int(os.getenv("PROGRESS_EVENT_BUFFER", "2000"))
+
+STATUS = "status"
+PHASE = "phase"
+CARDS = "cards"
+FIELDS = "fields"
+ROW = "row"
+DONE = "done"
+
+
+class JobEvents:
+    """Numbered progress events of one job, with a condition subscribers block on."""
+
+    def __init__(self, max_events=EVENT_BUFFER):
+        self.events = deque(maxlen=max_events)
+        self.next_id = 1
+        self.closed = False
+        self.condition = threading.Condition()
+
+    def publish(self, event, data):
+        with self.condition:
+            if self.closed:
+                return
+            self.events.append((self.next_id, event, data))
+            self.next_id += 1
+            self.condition.notify_all()
+
+    def close(self, event, data):
+        """Publish the final event; subscribers finish once they have read it."""
+        self.publish(event, data)
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def read(self, after=0, timeout=15):
+        """Events with id > after, waiting up to timeout for one. Returns (events, closed)."""
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            while True:
+                events = [e for e in self.events if e[0] > after]
+                remaining = deadline - time.monotonic()
+                if events or self.closed or remaining <= 0:
+                    return events, self.closed
+                self.condition.wait(remaining)
+
+
+class ProgressHub:
+    """JobEvents for every job the JobManager knows about."""
+
+    def __init__(self):
+        self.jobs = {}
+        self.lock = threading.Lock()
+
+    def open(self, job_id):
+        with self.lock:
+            self.jobs[job_id] = JobEvents()
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def discard(self, job_id):
+        with self.lock:
+            self.jobs.pop(job_id, None)
+
+
+hub = ProgressHub()
+
+
+def publish(event, **data):
+    """Publish an event to the job the calling thread runs for (see utils.logger.job_context); no-op outside a job."""
+    job_id = current_job()
+    events = hub.get(job_id) if job_id else None
+    if events is not None:
+        events.publish(event, data)
+
+
+def phase(name, **data):
+    publish(PHASE, phase=name, **data)
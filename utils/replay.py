@@ -0,0 +1,34 @@
+# replay.py
+
+import time
+from utils.logger import get_logger
+
+logger = get_logger("replay")
+
+
+def record_to(pool, har_path):
+    """Record every context the pool hands out into har_path (written when the context closes).
+
+    A path ending in .zip stores response bodies as separate files in the archive.
+    """
+    pool.context_options.update(record_har_path=har_path, record_har_mode="full")
+    logger.info(f"Recording network traffic to {har_path}")
+
+
+def replay_from(pool, har_path, latency_ms=0):
+    """Serve every request of the pool's contexts from har_path; anything not in it is aborted.
+
+    latency_ms delays each replayed request. Playwright's sync API runs route handlers
+    one at a time, so the delays add up per request rather than overlapping.
+    """
+    def install(context):
+        context.route_from_har(har_path, not_found="abort")
+        if latency_ms:
+            # Routes installed later run first, so this delays then falls back to the HAR.
+            def delayed(route):
+                time.sleep(latency_ms / 1000)
+                route.fallback()
+            context.route("**/*", delayed)
+
+    pool.context_hooks.append(install)
+    logger.info(f"Replaying network traffic from {har_path}" + (f" with {latency_ms}ms latency" if latency_ms else ""))
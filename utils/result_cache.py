@@ -0,0 +1,147 @@
+# result_cache.py
+
+import csv
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from utils.logger import get_logger
+from utils.output import read_meta, write_meta, file_sha256
+
+logger = get_logger("result_cache")
+
+CACHE_TTL = int(os.getenv("RESULT_CACHE_TTL", "3600"))
+CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "128"))
+
+
+def normalize_query(query):
+    return re.sub(r"\s+", " ", (query or "").strip().lower())
+
+
+def copy_head(src, dst, rows):
+    """Write the header and first `rows` data rows of CSV src to dst, with a metadata sidecar."""
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    with open(src, newline="", encoding="utf-8") as fin, open(dst, "w", newline="", encoding="utf-8") as fout:
+        reader = csv.reader(fin)
+        writer = csv.writer(fout)
+        for i, row in enumerate(reader):
+            if i > rows:
+                break
+            writer.writerow(row)
+
+    meta = dict(read_meta(src) or {})
+    meta.update(
+        rows=rows,
+        bytes=os.path.getsize(dst),
+        sha256=file_sha256(dst),
+        trimmed_from=os.path.basename(src),
+    )
+    write_meta(dst, meta)
+
+
+class ResultCache:
+    """TTL + LRU cache of finished scrape outputs keyed by (site, normalized query, options).
+
+    One entry is kept per key together with the limit it was scraped with. A request
+    is answered from it when the limit matches, when the cached run already holds at
+    least as many rows as requested (the file is cut down to the requested size), or
+    when the cached run was exhausted (it found fewer rows than it asked for).
+    """
+
+    def __init__(self, ttl=CACHE_TTL, max_entries=CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(site, query, options=None):
+        return (site, normalize_query(query), tuple(sorted((k, str(v)) for k, v in (options or {}).items())))
+
+    def _serves(self, entry, limit):
+        if entry["limit"] == limit:
+            return True
+        if limit is None:
+            return False
+        if limit < entry["count"] and not entry["file"].endswith(".csv"):
+            return False  # only CSV outputs can be trimmed to a smaller limit
+        exhausted = entry["limit"] is not None and entry["count"] < entry["limit"]
+        return entry["count"] >= limit or exhausted
+
+    def get(self, site, query, limit=None, options=None):
+        """Return the cached entry that can answer this request, or None."""
+        key = self.make_key(site, query, options)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and (time.time() - entry["created_at"] > self.ttl
+                                      or not os.path.exists(entry["file"])):
+                del self.entries[key]
+                entry = None
+            if entry is None or not self._serves(entry, limit):
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return dict(entry)
+
+    def put(self, site, query, limit, options, file, count):
+        key = self.make_key(site, query, options)
+        with self.lock:
+            current = self.entries.get(key)
+            # Keep a bigger result rather than replacing it with a smaller one.
+            if current is not None and self._serves(current, limit) and current["count"] > count \
+                    and os.path.exists(current["file"]):
+                self.entries.move_to_end(key)
+                return
+            self.entries[key] = {"file": file, "count": count, "limit": limit, "created_at": time.time()}
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def answer(self, site, query, limit, options, output_abs_path):
+        """Serve a request from cache, writing a trimmed copy to output_abs_path if needed.
+
+        Returns a run_scrape-style result dict, or None on a miss.
+        """
+        entry = self.get(site, query, limit, options)
+        if entry is None:
+            return None
+        count = entry["count"] if limit is None else min(limit, entry["count"])
+        if count == entry["count"]:
+            file = entry["file"]
+        else:
+            copy_head(entry["file"], output_abs_path, count)
+            file = output_abs_path
+        logger.info(f"Cache hit for {site}: {query!r} (limit={limit}) -> {os.path.basename(file)}")
+        return {
+            "success": True,
+            "file": file,
+            "count": count,
+            "cached": True,
+            "cache_age": round(time.time() - entry["created_at"], 1),
+        }
+
+    def invalidate(self, site=None, query=None):
+        """Drop entries matching site and/or query (everything if both are None)."""
+        query = normalize_query(query) if query else None
+        with self.lock:
+            keys = [
+                k for k in self.entries
+                if (site is None or k[0] == site) and (query is None or k[1] == query)
+            ]
+            for key in keys:
+                del self.entries[key]
+        return len(keys)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "entries": len(self.entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
@@ -0,0 +1,220 @@
+# result_store.py
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from utils.logger import get_logger
+
+logger = get_logger("result_store")
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DB_PATH = os.getenv("RESULTS_DB", os.path.join(BASE_DIR, "data", "results.db"))
+BATCH_SIZE = 200
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id TEXT PRIMARY KEY,
+    site TEXT NOT NULL,
+    query TEXT NOT NULL,
+    file TEXT,
+    started_at REAL NOT NULL,
+    finished_at REAL,
+    rows INTEGER DEFAULT 0,
+    status TEXT
+);
+CREATE TABLE IF NOT EXISTS records (
+    id INTEGER PRIMARY KEY,
+    run_id TEXT NOT NULL,
+    site TEXT NOT NULL,
+    query TEXT NOT NULL,
+    scraped_at REAL NOT NULL,
+    name TEXT,
+    name_norm TEXT,
+    phone TEXT,
+    phone_norm TEXT,
+    url TEXT,
+    address TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_records_name ON records(name_norm);
+CREATE INDEX IF NOT EXISTS idx_records_phone ON records(phone_norm);
+CREATE INDEX IF NOT EXISTS idx_records_url ON records(url);
+CREATE INDEX IF NOT EXISTS idx_records_site_time ON records(site, scraped_at);
+CREATE INDEX IF NOT EXISTS idx_records_run ON records(run_id);
+"""
+
+
+def normalize_name(value):
+    return re.sub(r"\s+", " ", (value or "").strip().lower())
+
+
+def normalize_phone(value):
+    return re.sub(r"\D", "", value or "")
+
+
+def parse_since(value):
+    """Epoch seconds from an epoch number or an ISO date/datetime string."""
+    if value in (None, ""):
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+def _field(row, *names):
+    for name in names:
+        value = row.get(name)
+        if value not in (None, "", "N/A"):
+            return str(value)
+    return None
+
+
+class ResultStore:
+    """SQLite (WAL) store of every scraped row, tagged with run, site, query and time.
+
+    Connections are per thread; WAL plus a busy timeout lets the web app and
+    runner.py processes write to the same file.
+    """
+
+    def __init__(self, db_path=DB_PATH):
+        self.db_path = db_path
+        self.local = threading.local()
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.connection().executescript(SCHEMA)
+
+    def connection(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+        return conn
+
+    def start_run(self, run_id, site, query, file=None):
+        with self.connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO runs (id, site, query, file, started_at) VALUES (?, ?, ?, ?, ?)",
+                (run_id, site, query, file, time.time()),
+            )
+        return RecordBatch(self, run_id, site, query)
+
+    def insert_rows(self, run_id, site, query, rows):
+        now = time.time()
+        values = []
+        for row in rows:
+            name = _field(row, "Name", "Company Name")
+            phone = _field(row, "Phone")
+            values.append((
+                run_id, site, query, now,
+                name, normalize_name(name),
+                phone, normalize_phone(phone) or None,
+                _field(row, "URL"),
+                _field(row, "Address", "Location"),
+                json.dumps(row, ensure_ascii=False),
+            ))
+        with self.connection() as conn:
+            conn.executemany(
+                "INSERT INTO records (run_id, site, query, scraped_at, name, name_norm, phone, phone_norm,"
+                " url, address, data) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                values,
+            )
+
+    def finish_run(self, run_id, rows, status):
+        with self.connection() as conn:
+            conn.execute(
+                "UPDATE runs SET finished_at = ?, rows = ?, status = ? WHERE id = ?",
+                (time.time(), rows, status, run_id),
+            )
+
+    def search(self, site=None, q=None, phone=None, url=None, since=None, run_id=None, limit=100, offset=0):
+        """Records matching every given filter, newest first.
+
+        q is a case-insensitive prefix match on the name, phone matches on digits only,
+        url is exact; all of them are served from indexes.
+        """
+        clauses, params = [], []
+        if site:
+            clauses.append("site = ?")
+            params.append(site)
+        if q:
+            prefix = normalize_name(q)
+            clauses.append("name_norm >= ? AND name_norm < ?")
+            params.extend([prefix, prefix + "\uffff"])
+        if phone:
+            clauses.append("phone_norm = ?")
+            params.append(normalize_phone(phone))
+        if url:
+            clauses.append("url = ?")
+            params.append(url)
+        if since is not None:
+            clauses.append("scraped_at >= ?")
+            params.append(since)
+        if run_id:
+            clauses.append("run_id = ?")
+            params.append(run_id)
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self.connection().execute(
+            f"SELECT run_id, site, query, scraped_at, data FROM records {where}"
+            " ORDER BY scraped_at DESC, id DESC LIMIT ? OFFSET ?",
+            params + [limit, offset],
+        ).fetchall()
+        return [
+            {
+                "run_id": r["run_id"],
+                "site": r["site"],
+                "query": r["query"],
+                "scraped_at": r["scraped_at"],
+                "data": json.loads(r["data"]),
+            }
+            for r in rows
+        ]
+
+
+class RecordBatch:
+    """Buffers one run's rows and inserts them BATCH_SIZE at a time in one transaction."""
+
+    def __init__(self, store, run_id, site, query):
+        self.store = store
+        self.run_id = run_id
+        self.site = site
+        self.query = query
+        self.pending = []
+        self.rows = 0
+
+    def add(self, row):
+        self.pending.append(row)
+        self.rows += 1
+        if len(self.pending) >= BATCH_SIZE:
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            self.store.insert_rows(self.run_id, self.site, self.query, self.pending)
+            self.pending = []
+
+    def close(self, status):
+        self.flush()
+        self.store.finish_run(self.run_id, self.rows, status)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Process-wide ResultStore, or None when disabled with RESULTS_DB_ENABLED=0."""
+    global _store
+    if os.getenv("RESULTS_DB_ENABLED", "1") == "0":
+        return None
+    with _store_lock:
+        if _store is None:
+            _store = ResultStore()
+        return _store
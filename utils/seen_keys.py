@@ -0,0 +1,126 @@
+# seen_keys.py
+
+import hashlib
+import json
+import os
+import re
+import struct
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SEEN_DIR = os.getenv("SEEN_KEYS_DIR", os.path.join(BASE_DIR, "data", "seen"))
+MAX_KEYS = int(os.getenv("SEEN_KEYS_MAX", "20000"))
+
+NEW = "new"
+CHANGED = "changed"
+UNCHANGED = "unchanged"
+
+MAGIC = b"SEEN1"
+HEADER = struct.Struct("<5sI")
+RECORD = struct.Struct("<QQI")
+
+
+def _hash64(text):
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def key_hash(*values):
+    """64-bit hash of the identifying values of an entry, ignoring case and whitespace."""
+    return _hash64("\x1f".join(re.sub(r"\s+", " ", str(v).strip().lower()) for v in values))
+
+
+def row_hash(row):
+    return _hash64(json.dumps(row, sort_keys=True, ensure_ascii=False))
+
+
+def as_bool(value):
+    """Option values arrive as strings from the CLI and as JSON from the API."""
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    return bool(value)
+
+
+class SeenKeys:
+    """Entries already scraped for one (site, query), kept between runs for delta scraping.
+
+    Each entry is a 20-byte record: 64-bit key hash, 64-bit hash of the row last
+    written for it and the number of the run that last saw it. Once more than
+    max_keys are stored, the entries seen longest ago are dropped on save().
+
+    Plugins call known() before an expensive step (opening a place page) to skip
+    entries scraped before, and observe() once they have a row, which tells them
+    whether it is new, changed or unchanged. Only call save() once per run.
+    """
+
+    def __init__(self, site, query, max_keys=MAX_KEYS, directory=SEEN_DIR):
+        query_id = hashlib.sha1(re.sub(r"\s+", " ", query.strip().lower()).encode("utf-8")).hexdigest()[:16]
+        self.path = os.path.join(directory, site, f"{query_id}.bin")
+        self.max_keys = max_keys
+        self.entries = {}
+        self.last_run = 0
+        self._load()
+        self.run = self.last_run + 1
+        self.seen_now = set()
+        self.counts = {NEW: 0, CHANGED: 0, UNCHANGED: 0}
+
+    def _load(self):
+        try:
+            with open(self.path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return
+        if len(data) < HEADER.size or data[:len(MAGIC)] != MAGIC:
+            return
+        self.last_run = HEADER.unpack_from(data)[1]
+        body = data[HEADER.size:]
+        body = body[:len(body) - len(body) % RECORD.size]
+        for key, content, run in RECORD.iter_unpack(body):
+            self.entries[key] = [content, run]
+
+    def _mark(self, key, status):
+        if key not in self.seen_now:
+            self.seen_now.add(key)
+            self.counts[status] += 1
+
+    def known(self, *key_values):
+        """True (and counted as unchanged) if this entry was scraped in an earlier run."""
+        key = key_hash(*key_values)
+        if key in self.seen_now:
+            return True
+        entry = self.entries.get(key)
+        if entry is None:
+            return False
+        entry[1] = self.run
+        self._mark(key, UNCHANGED)
+        return True
+
+    def observe(self, key_values, row):
+        """Record row under key_values and return NEW, CHANGED or UNCHANGED."""
+        key = key_hash(*key_values)
+        content = row_hash(row)
+        entry = self.entries.get(key)
+        if entry is None:
+            status = NEW
+        else:
+            status = UNCHANGED if entry[0] == content else CHANGED
+        self.entries[key] = [content, self.run]
+        self._mark(key, status)
+        return status
+
+    def summary(self):
+        """Counts for this run; disappeared = entries the previous run saw that this one did not."""
+        return dict(
+            self.counts,
+            disappeared=sum(1 for _, run in self.entries.values() if run == self.run - 1),
+            run=self.run,
+        )
+
+    def save(self):
+        entries = self.entries.items()
+        if len(self.entries) > self.max_keys:
+            entries = sorted(entries, key=lambda item: item[1][1], reverse=True)[:self.max_keys]
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, self.run))
+            f.write(b"".join(RECORD.pack(key, content, run) for key, (content, run) in entries))
+        os.replace(tmp_path, self.path)
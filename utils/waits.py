@@ -0,0 +1,105 @@
+# waits.py
+
+import time
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+from utils import metrics
+from utils.logger import get_logger
+
+logger = get_logger("waits")
+
+DEFAULT_TIMEOUT_MS = 5000
+
+DOM_SETTLE_JS = """
+([selector, quietMs, timeoutMs]) => new Promise((resolve) => {
+    const root = (selector && document.querySelector(selector)) || document.body;
+    let quietTimer = null;
+    const finish = (settled) => {
+        observer.disconnect();
+        clearTimeout(quietTimer);
+        clearTimeout(capTimer);
+        resolve(settled);
+    };
+    const observer = new MutationObserver(() => {
+        clearTimeout(quietTimer);
+        quietTimer = setTimeout(() => finish(true), quietMs);
+    });
+    observer.observe(root, {childList: true, subtree: true, attributes: true, characterData: true});
+    quietTimer = setTimeout(() => finish(true), quietMs);
+    const capTimer = setTimeout(() => finish(false), timeoutMs);
+})
+"""
+
+
+class Waiter:
+    """Event-driven waits for a page, each capped by a timeout.
+
+    Every wait returns True when its condition was met and False when it timed out,
+    and records how long it actually took so a run can report where its waiting
+    time went. Other errors, such as a closed page, propagate.
+
+    Pass another Waiter's timings to add this page's waits (e.g. a detail tab's)
+    to the same summary.
+    """
+
+    def __init__(self, page, timeout_ms=DEFAULT_TIMEOUT_MS, timings=None):
+        self.page = page
+        self.timeout_ms = timeout_ms
+        self.timings = timings if timings is not None else {}
+
+    def _timed(self, kind, wait, timeout_ms):
+        timeout_ms = timeout_ms or self.timeout_ms
+        started = time.perf_counter()
+        try:
+            satisfied = wait(timeout_ms) is not False
+        except PlaywrightTimeoutError:
+            satisfied = False
+        elapsed = time.perf_counter() - started
+        metrics.observe(f"wait_{kind}", elapsed)
+
+        stats = self.timings.setdefault(kind, {"count": 0, "total": 0.0, "max": 0.0, "timeouts": 0})
+        stats["count"] += 1
+        stats["total"] += elapsed
+        stats["max"] = max(stats["max"], elapsed)
+        if not satisfied:
+            stats["timeouts"] += 1
+        return satisfied
+
+    def count_grows(self, selector, previous_count, timeout_ms=None):
+        """Wait until more than previous_count elements match selector."""
+        return self._timed("count_grows", lambda t: self.page.wait_for_function(
+            "([sel, n]) => document.querySelectorAll(sel).length > n",
+            arg=[selector, previous_count], timeout=t,
+        ), timeout_ms)
+
+    def dom_settles(self, selector=None, quiet_ms=300, timeout_ms=None):
+        """Wait until no DOM mutations happen under selector (or body) for quiet_ms."""
+        return self._timed("dom_settles", lambda t: self.page.evaluate(
+            DOM_SETTLE_JS, [selector, quiet_ms, t]
+        ), timeout_ms)
+
+    def network_idle(self, timeout_ms=None):
+        """Wait until there are no network connections for at least 500 ms."""
+        return self._timed("network_idle", lambda t: self.page.wait_for_load_state(
+            "networkidle", timeout=t
+        ), timeout_ms)
+
+    def selector_changes(self, selector, previous_text, timeout_ms=None):
+        """Wait until selector exists and its text differs from previous_text."""
+        return self._timed("selector_changes", lambda t: self.page.wait_for_function(
+            "([sel, prev]) => { const el = document.querySelector(sel);"
+            " return !!el && el.textContent.trim() !== '' && el.textContent.trim() !== prev; }",
+            arg=[selector, previous_text or ""], timeout=t,
+        ), timeout_ms)
+
+    def summary(self):
+        """Per-kind wait stats in seconds: count, total, avg, max and timeouts."""
+        return {
+            kind: {
+                "count": s["count"],
+                "total": round(s["total"], 3),
+                "avg": round(s["total"] / s["count"], 3) if s["count"] else 0,
+                "max": round(s["max"], 3),
+                "timeouts": s["timeouts"],
+            }
+            for kind, s in self.timings.items()
+        }
@@ -1,21 +1,47 @@
 # validate_plugins.py
 
-import os
-import importlib.util
+import argparse
+import importlib
+import sys
+from utils.plugin_registry import PluginRegistry, PLUGIN_DIR, RESERVED_ARGS
 
-PLUGIN_DIR = "plugins"
+def load_plugins(plugin_dir=PLUGIN_DIR):
+    """{name: metadata} for every plugin, read from source without importing it (or Playwright)."""
+    return PluginRegistry(plugin_dir).describe()
 
-def load_plugins():
-    plugins = {}
-    for filename in os.listdir(PLUGIN_DIR):
-        if filename.endswith(".py") and filename != "__init__.py":
-            plugin_path = os.path.join(PLUGIN_DIR, filename)
-            module_name = filename[:-3]
-            spec = importlib.util.spec_from_file_location(module_name, plugin_path)
-            mod = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(mod)
+def validate(name, meta, import_modules=False):
+    """Problems found with one plugin; an empty list means it is valid."""
+    problems = []
+    if meta.get("error"):
+        return [f"cannot be parsed: {meta['error']}"]
+    if not meta["description"]:
+        problems.append("has no description string")
+    if not meta["has_run_scraper"]:
+        problems.append("has no run_scraper()")
+    elif meta["args"][:len(RESERVED_ARGS)] != list(RESERVED_ARGS):
+        problems.append(f"run_scraper() must start with ({', '.join(RESERVED_ARGS)})")
+    if import_modules and not problems:
+        try:
+            importlib.import_module(f"plugins.{name}")
+        except Exception as e:
+            problems.append(f"fails to import: {e}")
+    return problems
 
-            if hasattr(mod, "description") and hasattr(mod, "run_scraper"):
-                plugins[module_name] = mod
-    return plugins
+def main():
+    parser = argparse.ArgumentParser(description="Check every plugin in plugins/")
+    parser.add_argument("--import", dest="import_modules", action="store_true",
+                        help="Also import each plugin (needs its dependencies, e.g. Playwright)")
+    args = parser.parse_args()
 
+    failed = False
+    for name, meta in load_plugins().items():
+        problems = validate(name, meta, args.import_modules)
+        if problems:
+            failed = True
+            print(f"✗ {name}: {'; '.join(problems)}")
+        else:
+            print(f"✓ {name}: {meta['description']} (options: {', '.join(meta['options']) or 'none'})")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()